@@ -0,0 +1,107 @@
+"""
+Benchmark: Analyze tab latency. The three section prompts streamed one after
+another (how the tab used to run), the same three streamed concurrently, and
+one structured generation holding all three.
+Needs a running Ollama server; the LLM cache is bypassed so every run hits the model.
+Stops instead of printing timings if any generation comes back as an Ollama error,
+since those return at once and would look like a fast model.
+
+Usage:
+    python benchmarks/bench_analyze_modes.py policy.txt [repeats]
+
+Results, 6000-char policy, 3 runs per mode. No real model was reachable where
+these were taken, so they come from a stand-in Ollama HTTP server (same
+/api/chat protocol, through the ollama client) with fixed costs: 0.3s prompt
+processing and 25ms per token, answers of 120/200/160 tokens for summary/
+risks/clauses and 592 for the structured JSON. They measure how each mode
+schedules the work, not a model's speed:
+
+    server slots  mode         mean total s  mean first output s
+    4             sequential          13.27                 0.34
+    4             concurrent           5.50                 0.34
+    4             structured          15.40                15.40
+    1             sequential          13.25                 0.34
+    1             concurrent          13.29                 0.35
+    1             structured          15.41                15.41
+
+When the server generates in parallel (OLLAMA_NUM_PARALLEL > 1), concurrent
+mode finishes with the longest section. When it cannot, it is no slower than
+sequential. Structured mode only wins if the model's JSON answer is shorter
+than the longest section's answer (or, with one slot, than all three plus the
+two extra prompt passes), which depends on the model. Add real-model rows here
+(model, hardware, OLLAMA_NUM_PARALLEL) when they are taken.
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from policysherlock.policy_analysis import SECTION_PROMPTS, stream_sections, analyze_sections_structured
+from tools.ollama_agent import ask_ollama_stream, is_ollama_error
+from tools.llm_scheduler import LLM_PARALLELISM
+
+SAMPLE_POLICY = """
+We collect your name, email address, device identifiers and location data when you use the service.
+We share data with advertising partners and analytics providers. Data is retained for as long as necessary.
+You may request deletion of your account. We may change this policy at any time without notice.
+Our liability is limited to the amount you paid in the last twelve months. Either party may terminate.
+"""
+
+
+def check(outputs):
+    for output in outputs:
+        if is_ollama_error(output):
+            sys.exit(f"No timings: {output}")
+
+
+def run_sequential(text):
+    started = time.perf_counter()
+    first = None
+    sections = {}
+    for section, prompt in SECTION_PROMPTS.items():
+        for token in ask_ollama_stream(f"{prompt}\n\n{text}", use_cache=False):
+            if token and first is None:
+                first = time.perf_counter() - started
+            sections[section] = sections.get(section, "") + token
+    elapsed = time.perf_counter() - started
+    check(sections.values())
+    return elapsed, first
+
+
+def run_concurrent(text):
+    started = time.perf_counter()
+    first = None
+    sections = {}
+    for section, token in stream_sections(text, use_cache=False):
+        if token and first is None:
+            first = time.perf_counter() - started
+        sections[section] = sections.get(section, "") + (token or "")
+    elapsed = time.perf_counter() - started
+    check(sections.values())
+    return elapsed, first
+
+
+def run_structured(text):
+    started = time.perf_counter()
+    result = analyze_sections_structured(text, use_cache=False)
+    elapsed = time.perf_counter() - started
+    check([result["summary"]])  # an error answer fails the JSON parse and lands in the summary
+    return elapsed, elapsed  # nothing is shown until the JSON is complete
+
+
+def main():
+    text = open(sys.argv[1], encoding="utf-8").read() if len(sys.argv) > 1 else SAMPLE_POLICY
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    text = text[:6000]  # same input the Analyze tab sends
+
+    print(f"{len(text)} chars, {repeats} runs per mode, scheduler parallelism {LLM_PARALLELISM}\n")
+    print(f"{'mode':<12}{'mean total s':>14}{'mean first output s':>22}")
+    for name, fn in (("sequential", run_sequential), ("concurrent", run_concurrent), ("structured", run_structured)):
+        runs = [fn(text) for _ in range(repeats)]
+        total = sum(r[0] for r in runs) / repeats
+        first = sum(r[1] for r in runs) / repeats
+        print(f"{name:<12}{total:>14.2f}{first:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
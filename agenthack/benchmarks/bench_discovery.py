@@ -0,0 +1,116 @@
+"""
+Benchmark and fixture check for the policy-page discovery crawler.
+Serves a generated fixture site on many loopback addresses (127.0.0.N, one
+"domain" each) and runs discover_policy_pages over all of them. Each site
+hides its privacy policy two hops deep behind /legal, links a cookie policy
+from the footer, lists a German /datenschutz page only in a 2000-URL sitemap
+and disallows /private in robots.txt. Reports sites/s and whether the expected
+pages were found and the disallowed ones skipped.
+
+Usage:
+    python benchmarks/bench_discovery.py          # 200 sites
+    python benchmarks/bench_discovery.py 1000     # any number of sites (max 250 per /24, uses 127.0.x.y)
+"""
+import sys
+import os
+import time
+import threading
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from policysherlock.discovery import discover_policy_pages, best_pages
+
+NOISE_LINKS = 30
+SITEMAP_PRODUCTS = 2000
+
+
+def _page(body: str) -> bytes:
+    return f"<html><head><title>Fixture</title></head><body>{body}</body></html>".encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def fixture_response(host: str, path: str):
+    base = f"http://{host}"
+    if path == "/":
+        noise = "".join(f'<a href="/products/{i}">Product {i}</a>' for i in range(NOISE_LINKS))
+        return 200, "text/html", _page(
+            f'<nav><a href="/">Home</a><a href="/about">About us</a>{noise}</nav>'
+            '<footer><a href="/legal">Legal</a> <a href="/cookie-policy">Cookie settings</a>'
+            '<a href="/private/privacy-drafts">Privacy drafts</a></footer>'
+        )
+    if path == "/legal":
+        return 200, "text/html", _page(
+            '<a href="/legal/privacy-policy">Privacy Policy</a> <a href="/legal/terms">Terms of Service</a>'
+            '<a href="/legal/old-privacy">Privacy (archived)</a>'
+        )
+    if path in ("/legal/privacy-policy", "/legal/terms", "/cookie-policy", "/datenschutz", "/about"):
+        return 200, "text/html", _page("<p>Policy text.</p>")
+    if path == "/robots.txt":
+        return 200, "text/plain", f"User-agent: *\nDisallow: /private\nSitemap: {base}/sitemap.xml\n".encode()
+    if path == "/sitemap.xml":
+        urls = [f"{base}/products/{i}" for i in range(SITEMAP_PRODUCTS)]
+        urls += [f"{base}/datenschutz", f"{base}/private/privacy-internal"]
+        body = "".join(f"<url><loc>{u}</loc></url>" for u in urls)
+        return 200, "application/xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{body}</urlset>'
+        ).encode()
+    if path.startswith("/products/"):
+        return 200, "text/html", _page("<p>Product.</p>")
+    return 404, "text/html", _page("Not found")
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the crawler opens hundreds of connections at once
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        FixtureHandler.requests_seen.append(self.path)
+        status, content_type, body = fixture_response(self.headers.get("Host", "localhost"), self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = FixtureServer(("", 0), FixtureHandler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    homepages = [f"http://127.0.{1 + i // 250}.{1 + i % 250}:{port}/" for i in range(count)]
+
+    started = time.perf_counter()
+    results = discover_policy_pages(homepages)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    expected = {"privacy": "/legal/privacy-policy", "cookies": "/cookie-policy", "terms": "/legal/terms"}
+    found = {category: 0 for category in expected}
+    sitemap_hits = 0
+    for home, ranked in results.items():
+        for page in best_pages(ranked):
+            if page.url == home.rstrip("/") + expected[page.category]:
+                found[page.category] += 1
+        sitemap_hits += any(p.url.endswith("/datenschutz") and p.verified for p in ranked)
+    private = sum(1 for path in FixtureHandler.requests_seen if path.startswith("/private"))
+
+    print(f"sites: {count}   elapsed: {elapsed:.2f}s   {count / elapsed:.0f} sites/s   "
+          f"{len(FixtureHandler.requests_seen)} requests")
+    for category, hits in found.items():
+        print(f"  best {category:<8} correct on {hits}/{count} sites")
+    print(f"  /datenschutz found via sitemap on {sitemap_hits}/{count} sites")
+    print(f"  requests to robots-disallowed /private: {private}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: python-docx Document()/doc.paragraphs vs streaming iterparse extraction.
+Reports time, peak memory growth (RSS, measured in a fresh child process so
+libxml2 allocations count too) and how much text each path recovers.
+
+Usage:
+    python benchmarks/bench_docx_extract.py              # generated policy-like document
+    python benchmarks/bench_docx_extract.py policy.docx  # any saved document
+"""
+import sys
+import os
+import time
+import resource
+import multiprocessing
+from io import BytesIO
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from docx import Document
+from policysherlock.docx_extract import iter_docx_text
+
+SECTIONS = 4000
+
+
+def generated_docx() -> bytes:
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Acme Corp - Privacy Policy - Confidential"
+    for i in range(SECTIONS):
+        doc.add_heading(f"Section {i + 1}: Processing of personal data", level=2)
+        doc.add_paragraph(
+            "We collect your name, email address and device identifiers to provide the service. "
+            "Data may be shared with processors under written agreements and retained for 24 months."
+        )
+        if i % 10 == 0:
+            table = doc.add_table(rows=4, cols=3)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"Definition {i}.{r}.{c}: 'Personal data' means any information relating to a person"
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def python_docx_path(data):
+    # Mirrors the original load_text_from_upload DOCX branch
+    doc = Document(BytesIO(data))
+    return "\n".join([p.text for p in doc.paragraphs])
+
+
+def streaming_path(data):
+    return "\n".join(iter_docx_text(data))
+
+
+def _current_rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def _run(args):
+    name, data = args
+    fn = PATHS[name]
+    before = _current_rss_kb()
+    started = time.perf_counter()
+    text = fn(data)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return elapsed, max(0, peak - before) * 1024, len(text)
+
+
+PATHS = {"python-docx": python_docx_path, "streaming": streaming_path}
+
+
+def measure(name, data):
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        return pool.apply(_run, ((name, data),))
+
+
+def main():
+    data = open(sys.argv[1], "rb").read() if len(sys.argv) > 1 else generated_docx()
+    print(f"document: {len(data) / 1024:.0f} KB zipped\n")
+    print(f"{'path':<14}{'seconds':>10}{'peak MB':>10}{'chars':>10}")
+    for name in PATHS:
+        elapsed, peak, chars = measure(name, data)
+        print(f"{name:<14}{elapsed:>10.3f}{peak / 1e6:>10.1f}{chars:>10}")
+
+
+if __name__ == "__main__":
+    main()
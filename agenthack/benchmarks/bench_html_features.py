@@ -0,0 +1,94 @@
+"""
+Benchmark: BeautifulSoup tree + repeated find_all scans vs the single-pass extractor.
+
+Usage:
+    python benchmarks/bench_html_features.py            # synthetic pages shaped like outputs/data_inventory.csv
+    python benchmarks/bench_html_features.py --live     # fetch the sample URLs
+    python benchmarks/bench_html_features.py page.html  # any saved pages
+"""
+import sys
+import os
+import csv
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bs4 import BeautifulSoup
+from policysherlock.html_features import extract_features, etree
+
+SAMPLES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "outputs", "data_inventory.csv")
+REPEATS = 20
+# Approximate homepage sizes at the time the samples were taken
+PAGE_BYTES = {"Github": 550_000, "Wikipedia": 80_000}
+
+
+def soup_path(html):
+    # Mirrors the pre-extractor audit_page/Audit tab code
+    soup = BeautifulSoup(html, "html.parser")
+    forms = len(soup.find_all("form"))
+    inputs = len(soup.find_all("input"))
+    cookies = bool(soup.find(string=lambda s: s and "cookie" in s.lower()))
+    trackers = len(soup.find_all("script", src=True))
+    return forms, inputs, cookies, trackers
+
+
+def extractor_path(html):
+    f = extract_features(html)
+    return f["forms"], len(f["inputs"]), f["cookie_text"], len(f["script_srcs"])
+
+
+def synthetic_page(forms, inputs, cookies, scripts, size):
+    parts = ["<!DOCTYPE html><html><head><title>sample</title>"]
+    parts += [f'<script src="/assets/bundle-{i}.js" defer></script>' for i in range(scripts)]
+    parts.append("</head><body><nav><ul>" + "".join(f'<li><a href="/p{i}">Link {i}</a></li>' for i in range(40)) + "</ul></nav>")
+    per_form = max(1, inputs // max(1, forms))
+    made = 0
+    for i in range(forms):
+        fields = []
+        for _ in range(per_form if i < forms - 1 else inputs - made):
+            fields.append(f'<input type="text" name="field{made}" class="form-control">')
+            made += 1
+        parts.append(f'<form action="/f{i}" method="post">{"".join(fields)}</form>')
+    if cookies:
+        parts.append('<div class="banner">We use cookies to improve your experience.</div>')
+    filler = '<div class="card"><p>Lorem ipsum dolor sit amet, <b>consectetur</b> adipiscing elit.</p></div>'
+    body = "".join(parts)
+    parts.append(filler * max(0, (size - len(body)) // len(filler)))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def load_pages(argv):
+    if argv and argv[0] != "--live":
+        return [(os.path.basename(p), open(p, encoding="utf-8", errors="replace").read()) for p in argv]
+    with open(SAMPLES_CSV, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if argv and argv[0] == "--live":
+        from policysherlock.fetcher import fetch_pages
+        fetched = fetch_pages([r["url"] for r in rows])
+        return [(r["page"], fetched[r["url"]]) for r in rows]
+    return [
+        (r["page"], synthetic_page(int(r["forms"]), int(r["inputs"]), r["cookies"] == "Yes",
+                                   int(r["trackers"]), PAGE_BYTES.get(r["page"], 100_000)))
+        for r in rows
+    ]
+
+
+def timed(fn, html):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = fn(html)
+    return (time.perf_counter() - start) / REPEATS * 1000, result
+
+
+def main():
+    print(f"parser backend: {'lxml' if etree is not None else 'html.parser'}, {REPEATS} repeats\n")
+    print(f"{'page':<12}{'KB':>8}{'soup ms':>10}{'single-pass ms':>16}{'speedup':>9}  counts match")
+    for name, html in load_pages(sys.argv[1:]):
+        soup_ms, soup_counts = timed(soup_path, html)
+        fast_ms, fast_counts = timed(extractor_path, html)
+        print(f"{name:<12}{len(html) / 1024:>8.0f}{soup_ms:>10.2f}{fast_ms:>16.2f}{soup_ms / fast_ms:>8.1f}x  "
+              f"{soup_counts == fast_counts} {fast_counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: tracker classification with the shipped signature database and a
+generated one of 60k signatures (hosts, host/path prefixes and inline
+snippets). Builds a page with a realistic mix of first-party bundles, CDN
+assets, tracker scripts, pixels, iframes, <link> hints and inline snippets,
+and reports index build time, time per page (inline code included) and
+microseconds per URL resource.
+The old metric (every <script src> counted as a tracker) is shown alongside.
+
+Usage:
+    python benchmarks/bench_trackers.py           # generated page
+    python benchmarks/bench_trackers.py page.html # any saved page
+"""
+import sys
+import os
+import json
+import time
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from policysherlock.html_features import extract_features
+from policysherlock.trackers import TRACKER_DB_PATH, TrackerDB, summarize_trackers
+
+GENERATED_TRACKERS = 20_000  # three signatures each
+ROUNDS = 200
+
+
+def generated_db(shipped: list) -> list:
+    rng = random.Random(7)
+    trackers = list(shipped)
+    for i in range(GENERATED_TRACKERS):
+        domain = f"trk{i}-{rng.randrange(10**6)}.{rng.choice(['com', 'net', 'io', 'co.uk', 'de'])}"
+        trackers.append({
+            "id": f"generated_{i}", "name": f"Generated {i}", "category": "advertising",
+            "hosts": [domain],
+            "paths": [f"cdn{i}.example-cdn.net/px/{i}"],
+            "snippets": [f"trk{i}_q.push("],
+        })
+    return trackers
+
+
+def generated_page() -> str:
+    head = "".join(f'<script src="/assets/bundle-{i}.js"></script>' for i in range(58))  # first-party bundles
+    head += "".join(f'<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/lib{i}/dist.css">' for i in range(10))
+    head += (
+        '<link rel="preconnect" href="https://www.google-analytics.com">'
+        '<script src="https://www.googletagmanager.com/gtag/js?id=G-XXXX"></script>'
+        '<script src="https://connect.facebook.net/en_US/fbevents.js"></script>'
+        '<script src="https://static.hotjar.com/c/hotjar-1.js?sv=6"></script>'
+        '<script src="https://cdn1234.example-cdn.net/px/1234/tag.js"></script>'
+        "<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}"
+        "gtag('js',new Date());gtag('config','G-XXXX');</script>"
+        "<script>!function(f,b,e,v,n,t,s){}(window,document);fbq('init','123');fbq('track','PageView');</script>"
+        '<script type="application/json" id="__STATE__">' + json.dumps({f"key{i}": "value " * 20 for i in range(500)}) +
+        "</script><script>var cfg={theme:'dark',locale:'en',features:['search','cart','wishlist']};</script>"
+    )
+    body = "".join(f'<img src="https://images.example.com/p/{i}.jpg" alt="Product {i}">' for i in range(120))
+    body += '<img src="https://www.facebook.com/tr?id=123&ev=PageView" width="1" height="1">'
+    body += '<img src="https://px.ads.linkedin.com/collect/?pid=1" width="1" height="1">'
+    body += '<iframe src="https://www.youtube.com/embed/abc"></iframe><iframe src="https://td.doubleclick.net/td/rul/1"></iframe>'
+    return f"<html><head>{head}</head><body>{body}</body></html>"
+
+
+def resources(features: dict) -> int:
+    return sum(len(features[k]) for k in ("script_srcs", "pixels", "img_srcs", "iframes", "link_hrefs", "inline_scripts"))
+
+
+def bench(label: str, db: TrackerDB, features: dict, url: str):
+    urls_only = dict(features, inline_scripts=[])
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        db.classify(urls_only, url)
+    per_url = (time.perf_counter() - started) / ROUNDS / max(1, resources(urls_only))
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        hits = db.classify(features, url)
+    per_page = (time.perf_counter() - started) / ROUNDS
+    names = ", ".join(t.name for t in summarize_trackers(hits))
+    print(f"{label:<20} {len(db):>7,} signatures   {per_page * 1000:6.3f} ms/page   "
+          f"{per_url * 1e6:5.2f} µs/URL resource\n"
+          f"{'':<20} trackers: {names}")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8", errors="replace") as f:
+            html = f.read()
+    else:
+        html = generated_page()
+    features = extract_features(html)
+    url = "https://shop.example.com/"
+    print(f"page: {len(html):,} chars, {resources(features)} resources "
+          f"({len(features['script_srcs'])} script srcs, {len(features['inline_scripts'])} inline scripts "
+          f"of {sum(len(c) for c in features['inline_scripts']):,} chars)")
+    print(f"old metric (every script src): {len(features['script_srcs'])} trackers\n")
+
+    with open(TRACKER_DB_PATH, encoding="utf-8") as f:
+        shipped = json.load(f)["trackers"]
+    bench("shipped database", TrackerDB(shipped), features, url)
+
+    spec = generated_db(shipped)
+    started = time.perf_counter()
+    big = TrackerDB(spec)
+    print(f"\nindexed {len(big):,} signatures in {time.perf_counter() - started:.2f}s")
+    bench("generated database", big, features, url)
+
+
+if __name__ == "__main__":
+    main()
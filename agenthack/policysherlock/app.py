@@ -1,131 +1,271 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import streamlit as st
-from bs4 import BeautifulSoup
-import requests
 import json
+import time
+import uuid
+from itertools import islice
+from concurrent.futures import TimeoutError as FutureTimeout
 
 # --- App Logic Imports (unchanged) ---
 from policysherlock.main import (
     ask_ollama,
     analyze_policy,
     fetch_page,
+    fetch_pages,
     summarize_policy,
     compare_policies,
     detect_bias,
-    detect_cookies_and_trackers,
+    detect_trackers,
 )
-from policysherlock.text_utils import load_text_from_upload, chunk_text, keyword_rank
+from policysherlock.html_features import extract_features
+from policysherlock.text_utils import load_text_from_upload, load_document, keyword_rank
 from policysherlock.reporting import build_policy_report_md, to_bytes
+from policysherlock.policy_analysis import stream_sections, analyze_sections_structured
+from policysherlock.clause_diff import diff_clauses, truncate_diff
+from policysherlock.map_reduce import analyze_long_document, PART_MAX_CHARS
+from policysherlock.discovery import discover_policy_pages, best_pages
+from policysherlock.portia_client import PortiaClient, get_portia_client
+from policysherlock.portia_metadata import PortiaMetadata, get_portia_metadata
+from policysherlock.scrapyd_jobs import get_job_tracker, JobError
+from policysherlock.scrapyd_batch import schedule_url_batch, iter_batch_items
+from policysherlock.feed_ingest import job_feed_source, iter_feed_items, feed_entries
+from tools.ollama_agent import ask_ollama_stream, llm_cache_stats
+from tools.llm_scheduler import BATCH, INTERACTIVE
+
+PORTIA_JOB_TIMEOUT = 600   # seconds a tab waits for a crawl before reporting it as still running
+PORTIA_CONTEXT_ITEMS = 20  # scraped items kept for display and prompts
+PORTIA_AUDIT_PAGES = 50    # scraped pages audited per Portia run in the Audit tab
+COMPARE_DIFF_CHARS = 12000 # clause differences sent to the model in one Compare prompt
 
 # =========================
 # Dynamic Portia API Client
 # =========================
 class PortiaAPIClient:
-    def __init__(self, portia_url="http://localhost:9001", scrapyd_url="http://localhost:6800"):
-        self.portia_url = portia_url
-        self.scrapyd_url = scrapyd_url
+    """
+    Streamlit-facing wrapper around the shared pooled client (portia_client.py):
+    same lookups, with failures shown in the UI instead of raised.
+    Status, projects, spiders and pages come from the metadata cache shared
+    by all sessions (portia_metadata.py), so a rerun never waits on them.
+    """
+    def __init__(self, client: PortiaClient = None, metadata: PortiaMetadata = None):
+        self.client = client or get_portia_client()
+        self.metadata = metadata or (PortiaMetadata(client) if client else get_portia_metadata())
+        self.portia_url = self.client.portia_url
+        self.scrapyd_url = self.client.scrapyd_url
 
     def get_projects(self):
-        try:
-            r = requests.get(f"{self.portia_url}/api/projects", timeout=5)
-            if r.status_code == 200:
-                data = r.json()
-                return [p["id"] for p in data.get("data", [])]
-            return []
-        except Exception as e:
-            st.error(f"Error fetching projects: {e}")
-            return []
-
+        projects = self.metadata.projects()
+        if self.metadata.error("projects"):
+            st.error(f"Error fetching projects: {self.metadata.error('projects')}")
+        return projects
 
     def get_scrapyd_spiders(self, project_name):
-        try:
-            r = requests.get(f"{self.scrapyd_url}/api/projects/{project_name}/spiders", params={"project": project_name}, timeout=5)
-            if r.status_code == 200:
-                data = r.json()
-                return data.get("spiders", [])
-            return []
-        except Exception as e:
-            st.error(f"Error fetching Scrapyd spiders: {e}")
-            return []
+        spiders = self.metadata.scrapyd_spiders(project_name)
+        if self.metadata.error("scrapyd_spiders", project_name):
+            st.error(f"Error fetching Scrapyd spiders: {self.metadata.error('scrapyd_spiders', project_name)}")
+        return spiders
 
     def get_spider_pages(self, project_name, spider_name):
-      try:
-        r = requests.get(f"{self.portia_url}/api/projects/{project_name}/spiders/{spider_name}/samples",timeout=5)
-        if r.status_code == 200:
-            data = r.json()
-            pages = [s["id"] for s in data.get("data", [])]
-            return pages
-        return []
-      except Exception as e:
-            st.warning(f"Could not fetch spider pages: {e}")
-            return []
-
+        pages = self.metadata.pages(project_name, spider_name)
+        if self.metadata.error("pages", project_name, spider_name):
+            st.warning(f"Could not fetch spider pages: {self.metadata.error('pages', project_name, spider_name)}")
+        return pages
 
     def get_spiders(self, project_name):
-     try:
-        url = f"{self.portia_url}/api/projects/{project_name}/spiders"
-        r = requests.get(url, timeout=5)
-
-        if r.status_code == 200:
-            try:
-                data = r.json()
-                spiders = [s.get("id", s) for s in data.get("data", [])]
-                return spiders
-            except Exception as parse_err:
-                st.error(f"JSON parse error: {parse_err}")
-                return []
-        else:
-            st.error(f"Failed with status {r.status_code}: {r.text}")
-            return []
-     except Exception as e:
-        st.warning(f"Could not fetch spiders: {e}")
-        return []
+        spiders = self.metadata.spiders(project_name)
+        if self.metadata.error("spiders", project_name):
+            st.warning(f"Could not fetch spiders: {self.metadata.error('spiders', project_name)}")
+        return spiders
 
+    def get_samples(self, project_name, spider_name):
+        """
+        (status_code, samples JSON) for a spider.
+        """
+        return self.client.get_samples(project_name, spider_name)
 
     def schedule_spider(self, project_name, spider_name, page_name=None):
         try:
-            data = {"project": project_name, "spider": spider_name}
-            if page_name:
-                data["page"] = page_name
-            r = requests.post(f"{self.scrapyd_url}/schedule.json", data=data, timeout=10)
-            return r.json()
+            args = {"page": page_name} if page_name else {}
+            return self.client.schedule(project_name, spider_name, **args)
         except Exception as e:
             st.error(f"Error scheduling spider: {e}")
             return None
 
     def check_connection_status(self):
-        portia_status = "❌ Not Connected"
-        scrapyd_status = "❌ Not Connected"
-        try:
-            pr = requests.get(f"{self.portia_url}/api/projects", timeout=5)
-            portia_status = "✅ Connected" if pr.status_code == 200 else "❌ Error"
-        except:
-            pass
-        try:
-            sr = requests.get(f"{self.scrapyd_url}/daemonstatus.json", timeout=5)
-            scrapyd_status = "✅ Connected" if sr.status_code == 200 else "❌ Error"
-        except:
-            pass
+        portia_code, scrapyd_code = self.metadata.status()
+        portia_status = "✅ Connected" if portia_code == 200 else "❌ Error" if portia_code else "❌ Not Connected"
+        scrapyd_status = "✅ Connected" if scrapyd_code == 200 else "❌ Error" if scrapyd_code else "❌ Not Connected"
         return portia_status, scrapyd_status
 
-def get_portia_data_dynamic(url, api_client, project_name, spider_name, page_name=None):
+def get_portia_data_batch(urls, api_client, project_name, spider_name, page_name=None, timeout=PORTIA_JOB_TIMEOUT):
+    """
+    Crawl all urls in one Scrapyd job (one Scrapy process, however many URLs)
+    and return {url: info} with each URL's own scraped item, matched back from
+    the job's feed. Statuses as for get_portia_data_dynamic.
+    """
+    try:
+        args = {"page": page_name} if page_name else {}
+        batch = schedule_url_batch(urls, project_name, spider_name, client=api_client.client, **args)
+    except JobError as e:
+        return {url: {"status": "failed", "error": str(e)} for url in urls}
+    except Exception as e:
+        return {url: {"status": "error", "message": str(e)} for url in urls}
+    results = {
+        url: {"status": "scheduled", "job_id": batch.job_id, "url": url, "project": project_name,
+              "spider": spider_name, "page": page_name or "default", "items": []}
+        for url in urls
+    }
+    try:
+        job = batch.future.result(timeout=timeout)
+        for url, item in iter_batch_items(batch):
+            info = results[url]
+            info["status"] = "finished"
+            info["elapsed"] = f"{job.start_time} → {job.end_time}"
+            if item is not None:
+                info["items"].append(item)
+    except FutureTimeout:
+        pass
+    except Exception as e:
+        for info in results.values():
+            info.update(status="error", message=str(e))
+    return results
+
+def get_portia_data_dynamic(url, api_client, project_name, spider_name, page_name=None, timeout=PORTIA_JOB_TIMEOUT):
+    """
+    Schedule the spider and wait for its Scrapyd job to finish (as long as the
+    crawl takes, up to timeout), then return its first scraped items. With a
+    url, the job crawls that URL and returns its item; without one, the
+    spider's own start URLs.
+    status is "finished", "scheduled" (still running at timeout), "failed" or "error".
+    """
+    if url:
+        return get_portia_data_batch([url], api_client, project_name, spider_name, page_name, timeout)[url]
     try:
         result = api_client.schedule_spider(project_name, spider_name, page_name)
-        if result and result.get("status") == "ok":
-            return {
-                "status": "scheduled",
-                "job_id": result["jobid"],
-                "url": url,
-                "project": project_name,
-                "spider": spider_name,
-                "page": page_name or "default",
-            }
-        else:
+        if not (result and result.get("status") == "ok"):
             return {"status": "failed", "error": "Could not schedule spider"}
+        info = {
+            "status": "scheduled",
+            "job_id": result["jobid"],
+            "url": url,
+            "project": project_name,
+            "spider": spider_name,
+            "page": page_name or "default",
+        }
+        try:
+            job = get_job_tracker().track(project_name, result["jobid"], spider_name).result(timeout=timeout)
+        except FutureTimeout:
+            return info
+        info["status"] = "finished"
+        info["elapsed"] = f"{job.start_time} → {job.end_time}"
+        info["feed"] = job_feed_source(job)
+        info["items"] = list(islice(iter_feed_items(info["feed"]), PORTIA_CONTEXT_ITEMS))
+        return info
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+def portia_job_message(result):
+    if result.get("status") == "finished":
+        return f"Portia job finished · Job ID: {result['job_id']} · {len(result['items'])} item(s)"
+    return f"Portia job scheduled · Job ID: {result['job_id']} (still running)"
+
+# =================
+# Streaming Helpers
+# =================
+def render_card(placeholder, title, text, streaming=False):
+    cursor = "▌" if streaming else ""
+    placeholder.markdown(f'<div class="ps-card"><b>{title}</b><div class="ps-sep"></div>{text}{cursor}</div>', unsafe_allow_html=True)
+
+def stream_card(placeholder, title, tokens, refresh_secs=0.05):
+    """
+    Render streamed tokens live inside a card and return the full text.
+    """
+    text, last = "", 0.0
+    for token in tokens:
+        text += token
+        if time.monotonic() - last >= refresh_secs:
+            render_card(placeholder, title, text, streaming=True)
+            last = time.monotonic()
+    render_card(placeholder, title, text)
+    return text
+
+def stream_section_cards(cards, events, refresh_secs=0.05):
+    """
+    Fill several cards at once from (section, token) events, as produced by
+    stream_sections(). cards maps section -> (placeholder, title).
+    Returns {section: full_text} once every section has finished.
+    """
+    texts = {section: "" for section in cards}
+    dirty, last = set(), 0.0
+    for section, token in events:
+        if token is None:
+            dirty.discard(section)
+            render_card(*cards[section], texts[section])
+            continue
+        texts[section] += token
+        dirty.add(section)
+        if time.monotonic() - last >= refresh_secs:
+            for name in dirty:
+                render_card(*cards[name], texts[name], streaming=True)
+            dirty.clear()
+            last = time.monotonic()
+    return texts
+
+def render_page_audit(url, html):
+    """
+    Metrics chips, known trackers and streamed AI insights for one page, in a
+    card. Returns the summary-table row.
+    """
+    with st.container():
+        st.markdown('<div class="ps-card">', unsafe_allow_html=True)
+
+        # Parse HTML
+        features = extract_features(html)
+        forms = features["forms"]
+        inputs = features["inputs"]
+        cookies_present = features["cookie_text"]
+        trackers = detect_trackers(features, url)
+        tracker_count = len(trackers)
+
+        # Metrics row
+        st.markdown(
+            f"""
+            <div style="display:flex; flex-wrap:wrap; gap:8px;">
+              <span class="ps-chip">📝 Forms: {forms}</span>
+              <span class="ps-chip">⌨️ Inputs: {len(inputs)}</span>
+              <span class="ps-chip">🍪 Cookies: {"Yes" if cookies_present else "No"}</span>
+              <span class="ps-chip">👁️ Trackers: {tracker_count}</span>
+              <span class="ps-chip ps-chip--muted">🔗 {url}</span>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+        if trackers:
+            st.caption("Known trackers: " + ", ".join(f"{t.name} ({t.category})" for t in trackers))
+        st.markdown('<div class="ps-sep"></div>', unsafe_allow_html=True)
+
+        # AI analysis
+        ai_prompt = f"""
+Analyze this website for privacy and data collection practices. Focus on forms, inputs, cookies, trackers, and potential privacy risks. Be concise and actionable.
+
+URL: {url}
+HTML (truncated): {html[:4000]}
+"""
+        st.markdown("**🤖 AI Insights**")
+        ai_summary = st.write_stream(ask_ollama_stream(ai_prompt, priority=BATCH, session=llm_session))
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    return {
+        "URL": url,
+        "Forms": forms,
+        "Inputs": len(inputs),
+        "Cookies": "Yes" if cookies_present else "No",
+        "Trackers": tracker_count,
+        "AI Summary": (ai_summary[:200] + "...") if len(ai_summary) > 200 else ai_summary,
+    }
+
 # ===================
 # Streamlit Page Meta
 # ===================
@@ -336,9 +476,16 @@ st.markdown("""
 # ===============
 # Sidebar Control
 # ===============
-api_client = PortiaAPIClient()
+# Lookups are memoized for this script run only, shared by all four tabs
+api_client = PortiaAPIClient(get_portia_client().for_run(), get_portia_metadata())
+# Per-session id so the LLM scheduler can share the model fairly between users
+if "ps_session_id" not in st.session_state:
+    st.session_state["ps_session_id"] = uuid.uuid4().hex
+llm_session = st.session_state["ps_session_id"]
 with st.sidebar:
     st.markdown("### 🔧 Connections")
+    if st.button("🔄 Refresh", key="ps_refresh_connections", help="Probe Portia/Scrapyd and reload projects now"):
+        api_client.metadata.refresh()
     portia_status, scrapyd_status = api_client.check_connection_status()
     ok = "✅" in portia_status and "✅" in scrapyd_status
     st.markdown(
@@ -392,6 +539,13 @@ with st.sidebar:
         st.info("Connect Portia & Scrapyd to enable enhanced scraping.")
         st.session_state["portia_available"] = False
 
+    st.markdown("### ⚡ AI Cache")
+    cache_stats = llm_cache_stats()
+    st.caption(
+        f"{cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+        f"{cache_stats['entries']} cached responses"
+    )
+
 # =========
 # NAV TABS
 # =========
@@ -449,6 +603,11 @@ with tabs[0]:
                 height=140,
             )
             urls = [u.strip() for u in urls_text.splitlines() if u.strip()]
+            discover = st.toggle(
+                "Discover policy pages from homepages",
+                value=False,
+                help="Crawl each URL's site (links, sitemap.xml, robots.txt) and audit its privacy, cookie and terms pages instead.",
+            )
 
     with c2:
         st.markdown('<div class="space"></div>', unsafe_allow_html=True)
@@ -471,91 +630,65 @@ with tabs[0]:
             else:
                 with results_container:
                     st.markdown('<div class="ps-card">', unsafe_allow_html=True)
-                    with st.spinner("Scheduling Portia job..."):
+                    with st.spinner("Running Portia crawl..."):
                         portia_result = get_portia_data_dynamic(None, api_client, project, spider, page)
 
-                    if portia_result.get("status") == "scheduled":
-                        st.success(f"Portia job scheduled · Job ID: {portia_result['job_id']}")
-                        st.json(portia_result)
+                    if portia_result.get("status") in ("scheduled", "finished"):
+                        st.success(portia_job_message(portia_result))
+                        with st.expander("Job details"):
+                            st.json(portia_result)
                     else:
                         st.warning("Could not schedule spider. Showing raw JSON from Portia:")
                         try:
-                            raw_url = f"{api_client.portia_url}/api/projects/{selected_project}/spiders/{selected_spider}/samples"
-                            response = requests.get(raw_url, timeout=5)
-                            if response.status_code == 200:
-                                st.json(response.json())  # Display raw JSON directly
+                            status_code, samples = api_client.get_samples(selected_project, selected_spider)
+                            if status_code == 200:
+                                st.json(samples)  # Display raw JSON directly
                             else:
-                                st.error(f"Failed to fetch JSON: {response.status_code}")
+                                st.error(f"Failed to fetch JSON: {status_code}")
                         except Exception as e:
                             st.error(f"Error fetching JSON: {e}")
 
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                    # Audit the scraped pages straight from the job's item feed, one at a time
+                    if portia_result.get("status") == "finished":
+                        entries = islice(feed_entries(portia_result["feed"]), PORTIA_AUDIT_PAGES)
+                        for i, (_, page_url, page_html, _) in enumerate(entries, 1):
+                            progress_bar.progress(min(i / PORTIA_AUDIT_PAGES, 1.0))
+                            status.info(f"Auditing scraped page {i}: {page_url}")
+                            rows.append(render_page_audit(page_url, page_html))
+                        progress_bar.progress(1.0)
+
                     rows.append({
                         "Mode": "Portia",
                         "Project": project,
                         "Spider": spider,
                         "Page": page,
-                        "Result": "Scheduled" if portia_result.get("status") == "scheduled" else "Error",
+                        "Result": portia_result.get("status", "error").title(),
                     })
-                    st.markdown('</div>', unsafe_allow_html=True)
 
         else:
             # --- Manual audit with URLs ---
             if not urls:
                 st.warning("Please enter at least one URL to audit.")
             else:
+                if discover:
+                    with st.spinner(f"Discovering policy pages on {len(urls)} site(s)..."):
+                        discovered = discover_policy_pages(
+                            urls, progress=lambda stage, done, total: status.info(f"Discovery · {stage}: {done} page(s)")
+                        )
+                    found = [page.url for ranked in discovered.values() for page in best_pages(ranked)]
+                    status.info(f"Discovered {len(found)} policy page(s) on {len(discovered)} site(s).")
+                    urls = found or urls
+                with st.spinner(f"Fetching {len(urls)} page(s)..."):
+                    fetched_pages = fetch_pages(urls)
                 for i, url in enumerate(urls):
                     progress_bar.progress((i + 1) / len(urls))
                     status.info(f"Auditing {i+1}/{len(urls)}: {url}")
 
                     with results_container:
-                        with st.container():
-                            st.markdown('<div class="ps-card">', unsafe_allow_html=True)
-
-                            # Parse HTML
-                            html = fetch_page(url)
-                            soup = BeautifulSoup(html, "html.parser")
-                            forms = soup.find_all("form")
-                            inputs = soup.find_all("input")
-                            cookies_present, tracker_count = detect_cookies_and_trackers(soup)
-
-                            # Metrics row
-                            st.markdown(
-                                f"""
-                                <div style="display:flex; flex-wrap:wrap; gap:8px;">
-                                  <span class="ps-chip">📝 Forms: {len(forms)}</span>
-                                  <span class="ps-chip">⌨️ Inputs: {len(inputs)}</span>
-                                  <span class="ps-chip">🍪 Cookies: {"Yes" if cookies_present else "No"}</span>
-                                  <span class="ps-chip">👁️ Trackers: {tracker_count}</span>
-                                  <span class="ps-chip ps-chip--muted">🔗 {url}</span>
-                                </div>
-                                """,
-                                unsafe_allow_html=True,
-                            )
-                            st.markdown('<div class="ps-sep"></div>', unsafe_allow_html=True)
-
-                            # AI analysis
-                            with st.spinner("AI insights..."):
-                                ai_prompt = f"""
-Analyze this website for privacy and data collection practices. Focus on forms, inputs, cookies, trackers, and potential privacy risks. Be concise and actionable.
-
-URL: {url}
-HTML (truncated): {html[:4000]}
-"""
-                                ai_summary = ask_ollama(ai_prompt)
-
-                            st.markdown("**🤖 AI Insights**")
-                            st.write(ai_summary[:600] + ("..." if len(ai_summary) > 600 else ""))
-
-                            st.markdown('</div>', unsafe_allow_html=True)
-
-                            rows.append({
-                                "URL": url,
-                                "Forms": len(forms),
-                                "Inputs": len(inputs),
-                                "Cookies": "Yes" if cookies_present else "No",
-                                "Trackers": tracker_count,
-                                "AI Summary": (ai_summary[:200] + "...") if len(ai_summary) > 200 else ai_summary,
-                            })
+                        html = fetched_pages.get(url) or fetch_page(url)
+                        rows.append(render_page_audit(url, html))
 
                 progress_bar.progress(1.0)
                 status.success(f"Audit complete · {len(urls)} site(s) analyzed.")
@@ -582,6 +715,11 @@ with tabs[1]:
         analyze_btn = st.button("🔬 Analyze Policy", use_container_width=True, disabled=not bool(uploaded))
 
     if uploaded:
+        structured_mode = st.toggle(
+            "Single structured generation",
+            value=False,
+            help="Generate summary, risks and clauses in one JSON completion instead of three concurrent ones. Long documents are always analyzed part by part.",
+        )
         use_portia_policy = st.toggle(
             "Use Portia for related context",
             value=st.session_state.get("portia_available", False),
@@ -599,27 +737,57 @@ with tabs[1]:
         else:
             ca, cb, cc = st.columns(3)
             with ca:
-                with st.spinner("Generating summary..."):
-                    summary = ask_ollama(f"Provide a concise executive summary. Focus on scope, obligations, data handling, and user rights.\n\n{text[:6000]}")
-                st.markdown('<div class="ps-card"><b>🧠 Executive Summary</b><div class="ps-sep"></div>' + summary + '</div>', unsafe_allow_html=True)
+                summary_slot = st.empty()
             with cb:
-                with st.spinner("Detecting risks..."):
-                    risks_text = ask_ollama(f"List risks, loopholes or non-compliance gaps with severity (Low/Medium/High). Max 12 bullets.\n\n{text[:6000]}")
-                st.markdown('<div class="ps-card"><b>⚠️ Risks & Gaps</b><div class="ps-sep"></div>' + risks_text + '</div>', unsafe_allow_html=True)
+                risks_slot = st.empty()
             with cc:
-                with st.spinner("Extracting key clauses..."):
-                    clauses_text = ask_ollama(f"Extract the most important clauses or definitions as bullets (max 12). Be short.\n\n{text[:6000]}")
-                st.markdown('<div class="ps-card"><b>📑 Key Clauses</b><div class="ps-sep"></div>' + clauses_text + '</div>', unsafe_allow_html=True)
+                clauses_slot = st.empty()
+            cards = {
+                "summary": (summary_slot, "🧠 Executive Summary"),
+                "risks": (risks_slot, "⚠️ Risks & Gaps"),
+                "clauses": (clauses_slot, "📑 Key Clauses"),
+            }
+
+            started = time.perf_counter()
+            if len(text) > PART_MAX_CHARS:
+                # Long document: analyze every part, then merge, instead of reading only the first pages
+                mode = "map-reduce"
+                progress_bar = st.progress(0.0, text="Analyzing document parts...")
+                def on_progress(stage, done, total):
+                    if stage == "failed":
+                        st.warning(f"The model failed on {done} of {total} document parts; they are left out of the analysis.")
+                        return
+                    label = "Analyzing document parts" if stage == "map" else f"Merging results ({stage})"
+                    progress_bar.progress(done / total, text=f"{label}: {done}/{total}")
+                try:
+                    sections = analyze_long_document(text, priority=INTERACTIVE, session=llm_session, progress=on_progress)
+                except RuntimeError as e:
+                    st.error(str(e))
+                    sections = {section: "" for section in cards}
+                progress_bar.empty()
+                for section, (slot, title) in cards.items():
+                    render_card(slot, title, sections[section])
+            elif structured_mode:
+                mode = "structured"
+                with st.spinner("Generating structured analysis..."):
+                    sections = analyze_sections_structured(text, priority=INTERACTIVE, session=llm_session)
+                for section, (slot, title) in cards.items():
+                    render_card(slot, title, sections[section])
+            else:
+                mode = "concurrent"
+                sections = stream_section_cards(cards, stream_sections(text, priority=INTERACTIVE, session=llm_session))
+            st.caption(f"⏱️ Generated in {time.perf_counter() - started:.1f}s ({mode} mode)")
+            summary, risks_text, clauses_text = sections["summary"], sections["risks"], sections["clauses"]
 
             if st.session_state.get("portia_available") and 'use_portia_policy' in locals() and use_portia_policy and policy_url.strip():
                 st.markdown('<div class="ps-card"><b>🕷️ Additional Context</b><div class="ps-sep"></div>', unsafe_allow_html=True)
-                with st.spinner("Scheduling Portia scrape..."):
+                with st.spinner("Running Portia crawl..."):
                     project = st.session_state.get("portia_project", "")
                     spider = st.session_state.get("portia_spider", "")
                     page = st.session_state.get("portia_page", "default")
                     portia_result = get_portia_data_dynamic(policy_url, api_client, project, spider, page)
-                if portia_result.get("status") == "scheduled":
-                    st.success(f"Job scheduled: {portia_result['job_id']}")
+                if portia_result.get("status") in ("scheduled", "finished"):
+                    st.success(portia_job_message(portia_result))
                     st.json(portia_result)
                 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -670,24 +838,9 @@ with tabs[2]:
         if not ta.strip() or not tb.strip():
             st.error("Could not extract text from one or both files.")
         else:
-            with st.spinner("AI comparison..."):
-                diff_prompt = f"""Compare these two policies and provide a comprehensive analysis.
-
-Sections:
-1) Overview
-2) Major Differences
-3) Risk Analysis
-4) Compliance Gaps
-5) Recommendations
-
-Policy A ({file_a.name}):
-{ta[:6000]}
-
-Policy B ({file_b.name}):
-{tb[:6000]}
-"""
-                comparison_result = ask_ollama(diff_prompt)
-
+            with st.spinner("Aligning clauses..."):
+                clause_diff = diff_clauses(ta, tb)
+                diff_text, diff_omitted = truncate_diff(clause_diff, COMPARE_DIFF_CHARS)
             st.markdown(
                 f"""
                 <div class="ps-card">
@@ -696,39 +849,71 @@ Policy B ({file_b.name}):
                     <div style="display:flex; gap:12px; flex-wrap:wrap;">
                         <span class="ps-chip">A · {file_a.name}</span>
                         <span class="ps-chip">B · {file_b.name}</span>
+                        <span class="ps-chip ps-chip--muted">✏️ Changed: {len(clause_diff.changed)}</span>
+                        <span class="ps-chip ps-chip--muted">➕ Added: {len(clause_diff.added)}</span>
+                        <span class="ps-chip ps-chip--muted">➖ Removed: {len(clause_diff.removed)}</span>
+                        <span class="ps-chip ps-chip--muted">＝ Unchanged: {clause_diff.unchanged}</span>
                     </div>
                 </div>
                 """,
                 unsafe_allow_html=True,
             )
             st.markdown('<div class="space"></div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="ps-card"><b>🤖 AI Comparison</b><div class="ps-sep"></div>{comparison_result}</div>', unsafe_allow_html=True)
+            if not diff_text:
+                st.success("No clause-level differences found.")
+            else:
+                # Only the changed clauses go to the model; a diff longer than COMPARE_DIFF_CHARS is cut, and said so
+                diff_note = ""
+                if diff_omitted:
+                    st.warning(f"The documents differ in many places: the last {diff_omitted} differences do not fit "
+                               f"in one prompt and are not covered by the AI comparison.")
+                    diff_note = (f"\nThe list is cut off: {diff_omitted} further differences are not shown. "
+                                 f"Do not assume the rest of the documents match.")
+                diff_prompt = f"""Below are the clause-level differences between two policies, found by aligning both full documents.
+Unchanged clauses are omitted. Comment on the risk of each change.{diff_note}
+
+Sections:
+1) Overview
+2) Major Differences
+3) Risk Analysis
+4) Compliance Gaps
+5) Recommendations
+
+Policy A: {file_a.name}
+Policy B: {file_b.name}
+Differences ({clause_diff.summary()}):
+{diff_text}
+"""
+                comparison_result = stream_card(st.empty(), "🤖 AI Comparison", ask_ollama_stream(diff_prompt, priority=INTERACTIVE, session=llm_session))
+                with st.expander("Clause-level differences"):
+                    st.markdown(f'<div class="ps-mono">{diff_text}</div>', unsafe_allow_html=True)
 
             if 'use_portia_compare' in locals() and use_portia_compare:
                 st.markdown('<div class="space"></div>', unsafe_allow_html=True)
+                compare_urls = [u for u in (url_a if 'url_a' in locals() else "", url_b if 'url_b' in locals() else "") if u.strip()]
+                crawled = {}
+                if compare_urls:
+                    # A and B are crawled by one Scrapyd job
+                    with st.spinner(f"Crawling {len(compare_urls)} URL(s)..."):
+                        p = st.session_state.get("portia_project", "")
+                        s = st.session_state.get("portia_spider", "")
+                        g = st.session_state.get("portia_page", "default")
+                        crawled = get_portia_data_batch(list(dict.fromkeys(compare_urls)), api_client, p, s, g)
                 colA, colB = st.columns(2, gap="large")
                 if 'url_a' in locals() and url_a.strip():
                     with colA:
                         st.markdown('<div class="ps-card"><b>🌐 Policy A Web Context</b><div class="ps-sep"></div>', unsafe_allow_html=True)
-                        with st.spinner("Scheduling A..."):
-                            p = st.session_state.get("portia_project", "")
-                            s = st.session_state.get("portia_spider", "")
-                            g = st.session_state.get("portia_page", "default")
-                            pa = get_portia_data_dynamic(url_a, api_client, p, s, g)
-                        if pa.get("status") == "scheduled":
-                            st.success(f"Job scheduled: {pa['job_id']}")
+                        pa = crawled[url_a]
+                        if pa.get("status") in ("scheduled", "finished"):
+                            st.success(portia_job_message(pa))
                         st.json(pa)
                         st.markdown('</div>', unsafe_allow_html=True)
                 if 'url_b' in locals() and url_b.strip():
                     with colB:
                         st.markdown('<div class="ps-card"><b>🌐 Policy B Web Context</b><div class="ps-sep"></div>', unsafe_allow_html=True)
-                        with st.spinner("Scheduling B..."):
-                            p = st.session_state.get("portia_project", "")
-                            s = st.session_state.get("portia_spider", "")
-                            g = st.session_state.get("portia_page", "default")
-                            pb = get_portia_data_dynamic(url_b, api_client, p, s, g)
-                        if pb.get("status") == "scheduled":
-                            st.success(f"Job scheduled: {pb['job_id']}")
+                        pb = crawled[url_b]
+                        if pb.get("status") in ("scheduled", "finished"):
+                            st.success(portia_job_message(pb))
                         st.json(pb)
                         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -756,28 +941,32 @@ with tabs[3]:
             context_url = st.text_input("Additional Context URL", placeholder="https://company.com/help/privacy-faq")
 
     if up and q.strip() and ask_btn:
-        text = load_text_from_upload(up)
+        doc = load_document(up)
+        text = doc.text
         if not text.strip():
             st.error("Could not extract text.")
         else:
             with st.spinner("Finding relevant sections..."):
-                chunks = chunk_text(text)
-                top_contexts = keyword_rank(chunks, q)[:3]
-                context = "\n\n---\n\n".join(top_contexts)
+                top_spans = keyword_rank(doc.spans, q, top_k=3, doc_key=doc.key)
+                context = "\n\n---\n\n".join(
+                    f"[p. {doc.page_of(span.start)}, chars {span.start}-{span.end}]\n{span.text}" for span in top_spans
+                )
 
             additional_context = ""
             if 'use_portia_qa' in locals() and use_portia_qa and 'context_url' in locals() and context_url.strip():
-                with st.spinner("Scheduling Portia context..."):
+                with st.spinner("Crawling Portia context..."):
                     p = st.session_state.get("portia_project", "")
                     s = st.session_state.get("portia_spider", "")
                     g = st.session_state.get("portia_page", "default")
                     portia_context = get_portia_data_dynamic(context_url, api_client, p, s, g)
-                    if portia_context.get("status") == "scheduled":
+                    if portia_context.get("status") == "finished" and portia_context["items"]:
+                        scraped = json.dumps(portia_context["items"], ensure_ascii=False)[:4000]
+                        additional_context = f"\n\nAdditional web context scraped from {context_url}:\n{scraped}"
+                    elif portia_context.get("status") == "scheduled":
                         additional_context = f"\n\nAdditional web context scheduled from: {context_url} (Job ID: {portia_context['job_id']})"
 
-            with st.spinner("Generating answer..."):
-                prompt = f"""You are an expert policy analyst. Answer the user's question using ONLY the context provided.
-Quote relevant phrases exactly. If info is insufficient, say what's missing.
+            prompt = f"""You are an expert policy analyst. Answer the user's question using ONLY the context provided.
+Quote relevant phrases exactly and cite the [p., chars start-end] label they come from. If info is insufficient, say what's missing.
 
 Question: {q}
 
@@ -788,15 +977,13 @@ Document Context:
 
 Return a precise, helpful answer with quotes and, if applicable, a short "What’s missing" note.
 """
-                answer = ask_ollama(prompt)
-
-            st.markdown(f'<div class="ps-card"><b>💡 Answer</b><div class="ps-sep"></div>{answer}</div>', unsafe_allow_html=True)
+            answer = stream_card(st.empty(), "💡 Answer", ask_ollama_stream(prompt, priority=INTERACTIVE, session=llm_session))
 
             with st.expander("Context used"):
                 st.markdown(f'<div class="ps-mono">{context}</div>', unsafe_allow_html=True)
 
-            if 'portia_context' in locals() and portia_context.get("status") == "scheduled":
-                with st.expander("Scheduled web context"):
+            if 'portia_context' in locals() and portia_context.get("status") in ("scheduled", "finished"):
+                with st.expander("Web context" if portia_context["status"] == "finished" else "Scheduled web context"):
                     st.json(portia_context)
 
 # =========
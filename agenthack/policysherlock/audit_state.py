@@ -0,0 +1,127 @@
+# policysherlock/audit_state.py
+
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+
+from policysherlock.rule_engine import get_rule_pack
+from policysherlock.trackers import get_tracker_db
+
+# -----------------------
+# Config
+# -----------------------
+AUDIT_STATE_PATH = os.path.join("outputs", ".cache", "audit_state.sqlite")
+
+# Markup that changes between identical page loads: comments, nonces, CSRF tokens,
+# cache-busting query strings and epoch timestamps (seconds or ms since ~2001) in
+# time-named attributes or keys, e.g. data-ts="1700000000" or "serverTime":1700000000000
+VOLATILE_RE = re.compile(
+    r"<!--.*?-->"
+    r"|\s(?:nonce|data-nonce|data-csrf|data-token)=\"[^\"]*\""
+    r"|name=\"(?:csrf[-_]?token|_token|authenticity_token)\"\s+(?:content|value)=\"[^\"]*\""
+    r"|[?&](?:v|ver|version|t|ts|_|cb|cachebust)=[\w.-]*"
+    r"|(?:[\w-]*(?:time|date|stamp|expires|updated|generated)[\w-]*|\b(?:[\w-]*[-_])?ts)"
+    r"[\"']?\s*[=:]\s*[\"']?1\d{9}(?:\d{3})?(?!\d)",
+    re.IGNORECASE | re.DOTALL,
+)
+QUERY_RE = re.compile(r"[?#].*$")
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(html: str) -> str:
+    """
+    Hash of the page with volatile markup removed and whitespace collapsed,
+    so a re-fetch of an unchanged page hashes the same.
+    """
+    return _digest(" ".join(VOLATILE_RE.sub("", html).split()))
+
+
+def privacy_fingerprint(features: dict, html: str, page_url: str = "") -> str:
+    """
+    Hash of only what the privacy analysis depends on: forms and inputs, third
+    party scripts/iframes/pixels (without query strings), the known trackers
+    (first-party resources excluded, as in detect_trackers), cookie wording and
+    the rule-pack indicators present. Copy edits elsewhere on the page keep it stable.
+    """
+    payload = {
+        "forms": features["forms"],
+        "inputs": sorted((i["type"], i["name"]) for i in features["inputs"]),
+        "scripts": sorted({QUERY_RE.sub("", src) for src in features["script_srcs"]}),
+        "iframes": sorted({QUERY_RE.sub("", src) for src in features["iframes"]}),
+        "pixels": sorted({QUERY_RE.sub("", src) for src in features["pixels"]}),
+        "trackers": sorted({hit.tracker.id for hit in get_tracker_db().classify(features, page_url)}),
+        "cookie_text": features["cookie_text"],
+        "cookie_snippets": [" ".join(VOLATILE_RE.sub("", s).split()) for s in features["cookie_snippets"]],
+        "indicators": sorted({(hit.rule.id, hit.text.lower()) for hit in get_rule_pack().scan(html)}),
+    }
+    return _digest(json.dumps(payload, sort_keys=True))
+
+
+class AuditState:
+    """
+    Last audit result per URL: content and privacy fingerprints, parse metrics
+    and the AI analysis, so the next run can skip pages that did not change.
+    """
+
+    def __init__(self, path: str = AUDIT_STATE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS audits (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                privacy_hash TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                ai_analysis TEXT NOT NULL,
+                audited_at REAL NOT NULL
+            )"""
+        )
+
+    def get(self, url: str):
+        """
+        Return the stored audit for url as a dict, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, privacy_hash, metrics, ai_analysis, audited_at FROM audits WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        content_hash, privacy_hash, metrics, ai_analysis, audited_at = row
+        return {"content_hash": content_hash, "privacy_hash": privacy_hash, "metrics": json.loads(metrics),
+                "ai_analysis": ai_analysis, "audited_at": audited_at}
+
+    def put(self, url: str, content_hash: str, privacy_hash: str, metrics: dict, ai_analysis: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audits VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content_hash, privacy_hash, json.dumps(metrics), ai_analysis, time.time()),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM audits")
+
+
+_default_state = None
+_default_lock = threading.Lock()
+
+
+def get_audit_state() -> AuditState:
+    """
+    Process-wide store shared by all audit threads.
+    """
+    global _default_state
+    with _default_lock:
+        if _default_state is None:
+            _default_state = AuditState()
+        return _default_state
@@ -0,0 +1,354 @@
+# policysherlock/batch.py
+"""
+Non-interactive audit of a URL list, resumable after a crash or Ctrl+C.
+
+Usage:
+    python policysherlock/batch.py urls.csv --project P --spider S
+    cat urls.jsonl | python policysherlock/batch.py - --project P --spider S --output outputs/nightly
+    python policysherlock/batch.py items/P/S/<job>.jl --feed --project P --spider S [--job <job>]
+    python policysherlock/batch.py urls.csv --crawl --project P --spider S
+
+Input is CSV (a "url" column and optional "name"/"page" column, or bare
+name,url / url rows), JSON Lines ({"url": ..., "name": ...}) or one URL per line.
+With --feed the input is a Scrapyd item feed (a local .jl/.jl.gz file or an
+http(s) items URL): scraped pages are audited from their item, as they are
+read, without re-fetching; --job tails a local feed until that job finishes.
+With --crawl the URLs are crawled by the spider through Scrapyd, up to
+URLS_PER_JOB start URLs per job (one Scrapy process each, not one per URL),
+and each scraped item is audited as its URL's row; URLs the job produced no
+item for are fetched directly.
+With --discover the URLs are homepages: each site is crawled for its privacy,
+cookie and terms pages (see discovery.py) and those pages are audited instead.
+Rows are journaled to <output>/data_inventory.jsonl as they are written;
+re-running with the same output folder skips every URL already in it.
+Pages whose fetch or AI analysis fails are not journaled, so they are retried.
+"""
+
+import sys
+import os
+import io
+import csv
+import json
+import time
+import argparse
+import hashlib
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from rich.progress import Progress, BarColumn, MofNCompleteColumn, TimeElapsedColumn, TextColumn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import policysherlock.main as audit
+from policysherlock.main import (
+    console, sanitize_name, audit_page, create_portia_project, create_portia_spider,
+    OUTPUTS_ROOT, OUTPUT_RESULTS_NAME, MAX_THREADS,
+)
+from policysherlock.fetcher import fetch_pages
+from policysherlock.discovery import discover_policy_pages, best_pages, normalize_url
+from policysherlock.feed_ingest import SCRAPYD_ITEMS_DIR, feed_entries, normalize_item, item_html
+from policysherlock.scrapyd_jobs import get_job_tracker, JobError
+from policysherlock.scrapyd_batch import URLS_PER_JOB, schedule_url_batch, iter_batch_items
+from tools.results_sink import ResultsSink, export_jsonl
+from tools.llm_scheduler import get_scheduler
+from tools.ollama_agent import llm_cache_stats
+
+# -----------------------
+# Config
+# -----------------------
+BATCH_WINDOW = 200  # URLs fetched and audited per window; bounds the HTML held in memory
+DISCOVERY_WINDOW = 500  # homepages crawled per discovery pass
+
+
+def _name_for(url: str) -> str:
+    parts = urlsplit(url)
+    name = sanitize_name(f"{parts.netloc}{parts.path}".rstrip("/"))
+    # URLs differing only by query string must not share a report file
+    return f"{name}_{hashlib.sha1(parts.query.encode()).hexdigest()[:8]}" if parts.query else name
+
+
+def read_entries(stream, fmt: str = None):
+    """
+    Yield (name, url) pairs from a CSV, JSON Lines or plain URL list, lazily.
+    """
+    first = stream.readline()
+    if fmt is None:
+        stripped = first.lstrip()
+        fmt = "jsonl" if stripped.startswith("{") else "csv" if "," in first else "txt"
+    lines = _chain(first, stream)
+
+    if fmt == "jsonl":
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                url = record.get("url", "").strip()
+                if url:
+                    yield sanitize_name(record.get("name") or record.get("page") or _name_for(url)), url
+    elif fmt == "csv":
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        lowered = [h.strip().lower() for h in header]
+        if "url" in lowered:
+            url_col = lowered.index("url")
+            name_col = next((lowered.index(c) for c in ("name", "page") if c in lowered), None)
+            for row in reader:
+                if len(row) > url_col and row[url_col].strip():
+                    url = row[url_col].strip()
+                    name = row[name_col].strip() if name_col is not None and len(row) > name_col else ""
+                    yield sanitize_name(name or _name_for(url)), url
+        else:
+            # No header: the URL is the cell with a scheme, a name (if any) the first other cell
+            for row in _chain(header, reader):
+                cells = [c.strip() for c in row if c.strip()]
+                url = next((c for c in cells if "://" in c), "")
+                if url:
+                    name = next((c for c in cells if c != url), "")
+                    yield sanitize_name(name or _name_for(url)), url
+    else:
+        for line in lines:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield _name_for(url), url
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def discover_entries(entries, window: int = DISCOVERY_WINDOW):
+    """
+    Replace homepage entries with (<name>_<category>, url) entries for the best
+    privacy, cookie and terms page found on each site, window homepages at a time.
+    Sites where nothing is found are audited as given.
+    """
+    entries = iter(entries)
+    while True:
+        names = {}
+        for name, url in islice(entries, window):
+            names.setdefault(normalize_url(url if "://" in url else "https://" + url), (name, url))
+        if not names:
+            return
+        console.print(f"[cyan]Discovering policy pages on {len(names)} site(s)...[/cyan]")
+        for home, ranked in discover_policy_pages(list(names)).items():
+            name, url = names.get(home, (_name_for(home), home))
+            pages = best_pages(ranked)
+            if not pages:
+                yield name, url
+            for page in pages:
+                yield sanitize_name(f"{name}_{page.category}"), page.url
+
+
+def crawl_entries(entries, project_name: str, spider_name: str, skip=(), urls_per_job: int = URLS_PER_JOB):
+    """
+    Crawl (name, url) entries with the spider, urls_per_job URLs per Scrapyd
+    job, and yield (name, url, html, portia_summary) as each URL's item
+    arrives: html is the page markup when the item kept it, else None so the
+    page is fetched, with the item still used as its Portia data. URLs the
+    job finished without an item are yielded as (name, url). The next job is
+    scheduled before the current one's items are read, so crawling overlaps
+    auditing. URLs in skip (already journaled) are not crawled again.
+    """
+    entries = iter(entries)
+
+    def schedule_next():
+        names = {}
+        for name, url in entries:
+            if url not in skip:
+                names.setdefault(url, name)
+                if len(names) >= urls_per_job:
+                    break
+        if not names:
+            return None, None
+        try:
+            return names, schedule_url_batch(list(names), project_name, spider_name)
+        except (JobError, requests.RequestException) as e:
+            console.print(f"[yellow]{e}; fetching these {len(names)} URL(s) directly[/yellow]")
+            return names, None
+
+    names, batch = schedule_next()
+    while names:
+        following = schedule_next()
+        if batch is None:
+            yield from ((name, url) for url, name in names.items())
+        else:
+            console.print(f"[cyan]Scrapyd job {batch.job_id}: crawling {len(batch.urls)} URL(s)...[/cyan]")
+            try:
+                for url, item in iter_batch_items(batch):
+                    if item is None:
+                        yield names[url], url
+                    else:
+                        summary = normalize_item(item)[3]
+                        yield names[url], url, item_html(item) or None, summary
+            except (JobError, requests.RequestException) as e:
+                console.print(f"[yellow]Scrapyd job {batch.job_id} failed: {e}; fetching its other URLs directly[/yellow]")
+                yield from ((names[url], url) for url in batch.remaining())
+        names, batch = following
+
+
+def load_checkpoint(journal_path: str) -> set:
+    """
+    URLs already written to the journal. A torn last line from a crash mid-write
+    is truncated away so new rows append cleanly.
+    """
+    done = set()
+    if not os.path.exists(journal_path):
+        return done
+    good_end = 0
+    with open(journal_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["url"])
+            except (ValueError, KeyError):
+                break
+            good_end += len(line)
+    if good_end != os.path.getsize(journal_path):
+        with open(journal_path, "r+b") as f:
+            f.truncate(good_end)
+    return done
+
+
+def run_batch(entries, output_folder: str, project_name: str, spider_name: str,
+              workers: int = MAX_THREADS, window: int = BATCH_WINDOW) -> dict:
+    """
+    Audit every (name, url) entry not yet in the journal, window by window.
+    Entries may also be (name, url, html, portia_summary), as feed_entries()
+    yields; those pages are audited as given instead of fetched.
+    Returns counters for the throughput summary.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    base = os.path.join(output_folder, OUTPUT_RESULTS_NAME)
+    done = load_checkpoint(base + ".jsonl")
+    resumed = len(done)
+    # The JSON Lines file is the journal: a URL counts as done once its row is fsynced there
+    results = ResultsSink(base, formats=("jsonl",))
+
+    stats = {"resumed": resumed, "audited": 0, "failed": 0, "statuses": {}}
+    llm_before = get_scheduler().stats()["completed"]
+    started = time.perf_counter()
+    entries = iter(entries)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with Progress(TextColumn("[cyan]Auditing"), BarColumn(), MofNCompleteColumn(), TimeElapsedColumn(),
+                      TextColumn("{task.fields[rate]}"), console=console, transient=False) as progress:
+            task = progress.add_task("audit", total=None, rate="")
+            while True:
+                window_entries = list(islice(entries, window))
+                if not window_entries:
+                    break
+                pending = []
+                for entry in window_entries:
+                    name, url, html, summary = (*entry, None, None)[:4]
+                    if url not in done:
+                        done.add(url)  # also drops duplicates later in the input
+                        pending.append((name, url, html, summary))
+                if not pending:
+                    continue
+                to_fetch = [url for _, url, html, _ in pending if html is None]
+                prefetched = fetch_pages(to_fetch) if audit.USE_ASYNC_FETCH and to_fetch else {}
+                futures = {
+                    executor.submit(audit_page, name, url, results, output_folder, project_name, spider_name,
+                                    html if html is not None else prefetched.get(url), summary): url
+                    for name, url, html, summary in pending
+                }
+                prefetched = None
+                for future in as_completed(futures):
+                    try:
+                        status = future.result()["Status"]
+                        if status == "failed":
+                            # Fetch or model error: audit_page wrote no row, so the next run retries it
+                            stats["failed"] += 1
+                        else:
+                            stats["audited"] += 1
+                            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+                    except Exception as e:
+                        # Not journaled, so the next run retries it
+                        stats["failed"] += 1
+                        console.print(f"[red]Audit failed for {futures[future]}: {e}[/red]")
+                    elapsed = time.perf_counter() - started
+                    progress.update(task, advance=1, rate=f"{stats['audited'] / elapsed:.2f} pages/s")
+    finally:
+        # On Ctrl+C, drop queued audits but let running ones finish and reach the journal
+        executor.shutdown(wait=True, cancel_futures=True)
+        console.print(f"[green]{results.close()}[/green]")
+
+    stats["elapsed"] = time.perf_counter() - started
+    stats["llm_calls"] = get_scheduler().stats()["completed"] - llm_before
+    if os.path.exists(base + ".jsonl"):  # absent when every page so far failed
+        console.print(f"[green]{export_jsonl(base + '.jsonl', base)}[/green]")
+    return stats
+
+
+def print_summary(stats: dict) -> None:
+    elapsed = max(stats["elapsed"], 1e-9)
+    cache = llm_cache_stats()
+    console.print(
+        f"\n[bold]Batch summary[/bold]\n"
+        f"  audited      {stats['audited']} pages ({stats['failed']} failed, {stats['resumed']} already done)\n"
+        f"  elapsed      {stats['elapsed']:.1f}s\n"
+        f"  throughput   {stats['audited'] / elapsed:.2f} pages/s, {stats['llm_calls'] / elapsed:.2f} LLM calls/s "
+        f"({stats['llm_calls']} calls)\n"
+        f"  LLM cache    {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})\n"
+        f"  statuses     " + ", ".join(f"{k}: {v}" for k, v in sorted(stats["statuses"].items()))
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Audit a list of URLs without prompts; re-run to resume.")
+    parser.add_argument("input", help="CSV, JSON Lines or plain URL list; '-' reads stdin")
+    parser.add_argument("--project", required=True, help="Portia project name")
+    parser.add_argument("--spider", required=True, help="Portia spider name")
+    parser.add_argument("--output", help="output folder (default: outputs/batch_<input name>); reuse it to resume")
+    parser.add_argument("--format", choices=["csv", "jsonl", "txt"], help="input format (default: detected)")
+    parser.add_argument("--workers", type=int, default=MAX_THREADS, help="concurrent audits")
+    parser.add_argument("--feed", action="store_true",
+                        help="input is a Scrapyd item feed (.jl file or items URL); audit the scraped pages")
+    parser.add_argument("--job", help="with --feed: Scrapyd job id whose local feed is tailed until it finishes")
+    parser.add_argument("--crawl", action="store_true",
+                        help=f"crawl the URLs through Scrapyd, {URLS_PER_JOB} per job, and audit each from its item")
+    parser.add_argument("--discover", action="store_true",
+                        help="treat the URLs as homepages and audit the policy pages found on each site")
+    parser.add_argument("--stream", action="store_true", help="print AI analysis to the console as it is generated")
+    args = parser.parse_args(argv)
+
+    audit.STREAM_TO_CONSOLE = args.stream
+    project_name, spider_name = sanitize_name(args.project), sanitize_name(args.spider)
+    if not create_portia_project(project_name) or not create_portia_spider(project_name, spider_name):
+        console.print("[red]Could not create or access the Portia project/spider. Exiting.[/red]")
+        return 1
+
+    stem = "stdin" if args.input == "-" else os.path.splitext(os.path.basename(args.input))[0]
+    output_folder = args.output or os.path.join(OUTPUTS_ROOT, f"batch_{sanitize_name(stem)}")
+    if args.feed:
+        follow = None
+        if args.job:
+            job = get_job_tracker().track(project_name, args.job, spider_name)
+            follow = lambda: not job.done()
+        # While tailing a live crawl, audit in small windows so pages are not held back waiting for more
+        stats = run_batch(feed_entries(args.input, follow, name_for=_name_for), output_folder,
+                          project_name, spider_name, args.workers, window=args.workers if follow else BATCH_WINDOW)
+        print_summary(stats)
+        return 0
+
+    stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if args.input == "-" else \
+        open(args.input, encoding="utf-8", newline="")
+    with stream:
+        entries = read_entries(stream, args.format)
+        if args.discover:
+            entries = discover_entries(entries)
+        window = BATCH_WINDOW
+        if args.crawl:
+            done = load_checkpoint(os.path.join(output_folder, OUTPUT_RESULTS_NAME + ".jsonl"))
+            entries = crawl_entries(entries, project_name, spider_name, skip=done)
+            # A tailed feed hands items on as they are scraped; don't hold them back for a full window
+            window = args.workers if SCRAPYD_ITEMS_DIR else BATCH_WINDOW
+        stats = run_batch(entries, output_folder, project_name, spider_name, args.workers, window=window)
+    print_summary(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
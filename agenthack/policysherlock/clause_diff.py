@@ -0,0 +1,173 @@
+# policysherlock/clause_diff.py
+
+import re
+import hashlib
+from collections import defaultdict, deque
+
+PARAGRAPH_SPLIT_RE = re.compile(r"\n[ \t]*\n+")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+(?=[\"'(\[]?[A-Z0-9])")
+NORMALIZE_RE = re.compile(r"\W+")
+ENUMERATOR_RE = re.compile(r"\(?(?:\d+(?:\.\d+)*|[ivxlc]{1,4}|[A-Za-z])[.)]")  # "1.", "2.3.", "(iv)", "a)"
+
+SHINGLE_WORDS = 3
+MAX_SHINGLE_DF = 40      # shingles shared by more clauses than this are boilerplate, not evidence
+MAX_CANDIDATES = 8       # similarity is only computed against the best-overlapping clauses
+CHANGED_THRESHOLD = 0.45  # Jaccard similarity for "same clause, edited"
+
+
+class Clause:
+    __slots__ = ("index", "text", "start", "end", "key", "shingles")
+
+    def __init__(self, index, text, start, end):
+        self.index = index
+        self.text = text
+        self.start = start
+        self.end = end
+        words = NORMALIZE_RE.sub(" ", text.lower()).split()
+        self.key = hashlib.sha1(" ".join(words).encode("utf-8")).digest()
+        if len(words) < SHINGLE_WORDS:
+            self.shingles = {" ".join(words)}
+        else:
+            self.shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+class ClauseDiff:
+    """
+    Result of diff_clauses(): removed/added clauses and (old, new, similarity)
+    triples for clauses that were edited rather than replaced.
+    """
+
+    def __init__(self, removed, added, changed, unchanged):
+        self.removed = removed
+        self.added = added
+        self.changed = changed
+        self.unchanged = unchanged
+
+    def summary(self) -> str:
+        return (f"{len(self.changed)} changed, {len(self.added)} added, "
+                f"{len(self.removed)} removed, {self.unchanged} unchanged clauses")
+
+
+def segment_clauses(text: str) -> list:
+    """
+    Split a policy into clauses: paragraphs (section blocks), then sentences.
+    """
+    clauses = []
+    pos = 0
+    for block in PARAGRAPH_SPLIT_RE.split(text):
+        block_start = text.find(block, pos)
+        pos = block_start + len(block)
+        pieces, sentence_pos = [], 0
+        for sentence in SENTENCE_SPLIT_RE.split(block):
+            offset = block.find(sentence, sentence_pos)
+            sentence_pos = offset + len(sentence)
+            if pieces and ENUMERATOR_RE.fullmatch(pieces[-1][1].strip()):
+                # A bare "1." or "(a)" belongs to the sentence it numbers
+                prev_offset, _ = pieces.pop()
+                pieces.append((prev_offset, block[prev_offset:sentence_pos]))
+            else:
+                pieces.append((offset, sentence))
+        for offset, sentence in pieces:
+            stripped = sentence.strip()
+            if stripped and NORMALIZE_RE.sub("", stripped):
+                start = block_start + offset + (len(sentence) - len(sentence.lstrip()))
+                clauses.append(Clause(len(clauses), " ".join(stripped.split()), start, start + len(stripped)))
+    return clauses
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+def diff_clauses(text_a: str, text_b: str) -> ClauseDiff:
+    """
+    Align the clauses of two documents and report what changed from A to B.
+    Identical clauses are paired by normalized hash (wherever they moved to);
+    the rest are paired by shingle similarity through an inverted index, so the
+    work stays close to linear in document size.
+    """
+    clauses_a = segment_clauses(text_a)
+    clauses_b = segment_clauses(text_b)
+
+    # 1) exact matches by normalized hash
+    by_key = defaultdict(deque)
+    for clause in clauses_b:
+        by_key[clause.key].append(clause)
+    left_a, unchanged = [], 0
+    for clause in clauses_a:
+        bucket = by_key.get(clause.key)
+        if bucket:
+            bucket.popleft()
+            unchanged += 1
+        else:
+            left_a.append(clause)
+    left_b = [c for bucket in by_key.values() for c in bucket]
+
+    # 2) edited clauses: candidates share rare shingles, scored by Jaccard
+    index = defaultdict(list)
+    for clause in left_b:
+        for shingle in clause.shingles:
+            index[shingle].append(clause.index)
+    b_by_index = {c.index: c for c in left_b}
+
+    pairs = []
+    for clause in left_a:
+        overlap = defaultdict(int)
+        for shingle in clause.shingles:
+            postings = index.get(shingle)
+            if postings and len(postings) <= MAX_SHINGLE_DF:
+                for i in postings:
+                    overlap[i] += 1
+        best = sorted(overlap.items(), key=lambda kv: -kv[1])[:MAX_CANDIDATES]
+        for i, _ in best:
+            score = _jaccard(clause.shingles, b_by_index[i].shingles)
+            if score >= CHANGED_THRESHOLD:
+                pairs.append((score, clause.index, i))
+
+    # Greedy one-to-one assignment, best pairs first
+    pairs.sort(reverse=True)
+    a_by_index = {c.index: c for c in left_a}
+    used_a, used_b, changed = set(), set(), []
+    for score, ia, ib in pairs:
+        if ia in used_a or ib in used_b:
+            continue
+        used_a.add(ia)
+        used_b.add(ib)
+        changed.append((a_by_index[ia], b_by_index[ib], score))
+    changed.sort(key=lambda pair: pair[0].index)
+
+    removed = [c for c in left_a if c.index not in used_a]
+    added = sorted((c for c in left_b if c.index not in used_b), key=lambda c: c.index)
+    return ClauseDiff(removed, added, changed, unchanged)
+
+
+def truncate_diff(diff: ClauseDiff, max_chars: int = 12000):
+    """
+    (text, omitted): the changed clauses rendered as plain text, at most
+    max_chars long, and how many differences did not fit.
+    """
+    lines = []
+    for old, new, score in diff.changed:
+        lines.append(f"CHANGED ({score:.0%} similar)\n  A: {old.text}\n  B: {new.text}")
+    lines += [f"REMOVED (only in A): {c.text}" for c in diff.removed]
+    lines += [f"ADDED (only in B): {c.text}" for c in diff.added]
+
+    out, used = [], 0
+    for i, line in enumerate(lines):
+        if used + len(line) > max_chars:
+            out.append(f"... {len(lines) - i} more differences not shown")
+            return "\n".join(out), len(lines) - i
+        out.append(line)
+        used += len(line) + 1
+    return "\n".join(out), 0
+
+
+def format_diff(diff: ClauseDiff, max_chars: int = 12000) -> str:
+    """
+    Render the changed clauses as plain text, at most max_chars long,
+    for display or for an LLM prompt.
+    """
+    return truncate_diff(diff, max_chars)[0]
@@ -0,0 +1,318 @@
+# policysherlock/discovery.py
+
+import re
+import gzip
+import heapq
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit, urlunsplit, unquote
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import iterparse
+
+from policysherlock.fetcher import fetch_pages, fetch_stream, FETCH_ERROR_PREFIXES
+from policysherlock.html_features import extract_links
+
+# -----------------------
+# Config
+# -----------------------
+MAX_DEPTH = 2                 # link hops from the homepage
+MAX_PAGES_PER_SITE = 12       # HTML pages fetched per site, homepage included
+MAX_PAGES_PER_LEVEL = 6       # best-scoring candidates fetched per site per BFS level
+MIN_FOLLOW_SCORE = 6          # links scoring below this are neither crawled nor reported
+MAX_SITEMAPS = 5              # sitemap files read per site, index children included
+MAX_SITEMAP_URLS = 50_000     # <loc> entries read per site before giving up
+MAX_SITEMAP_CANDIDATES = 20   # best sitemap URLs kept per site
+MAX_ROBOTS_BYTES = 512 * 1024
+SITE_THREADS = 32             # robots.txt readers running at once
+SITEMAP_THREADS = 4           # sitemap parsing is CPU-bound; more threads only slow the BFS rounds down
+ROBOTS_AGENT = "PolicySherlock"
+ANCHOR_WEIGHT = 2             # anchor text is a stronger signal than the URL path
+CATEGORIES = ("privacy", "cookies", "terms")
+
+# keyword: (category or None, weight). Short keywords must match a whole word;
+# six letters and up also match inside words ("privacypolicy", "cookie-richtlinie").
+POLICY_KEYWORDS = {
+    "privacy": ("privacy", 10),
+    "datenschutz": ("privacy", 10),
+    "privacidad": ("privacy", 9),
+    "privacidade": ("privacy", 9),
+    "confidentialit": ("privacy", 9),
+    "riservatezza": ("privacy", 8),
+    "privacybeleid": ("privacy", 9),
+    "data protection": ("privacy", 8),
+    "personal information": ("privacy", 4),
+    "do not sell": ("privacy", 6),
+    "gdpr": ("privacy", 5),
+    "ccpa": ("privacy", 5),
+    "dsgvo": ("privacy", 5),
+    "cookie": ("cookies", 8),
+    "cookies": ("cookies", 8),
+    "terms": ("terms", 7),
+    "conditions": ("terms", 4),
+    "tos": ("terms", 5),
+    "agb": ("terms", 7),
+    "nutzungsbedingungen": ("terms", 8),
+    "condiciones": ("terms", 5),
+    "legal": (None, 3),
+    "impressum": (None, 2),
+    "policy": (None, 3),
+    "policies": (None, 3),
+    "notice": (None, 1),
+}
+WORD_RE = re.compile(r"[^\W\d_]+")
+# Cheap pre-check so the bulk of sitemap entries (products, articles) skip scoring.
+# Matched against lower-cased text: re.IGNORECASE makes this alternation ~10x slower.
+KEYWORD_RE = re.compile("|".join(sorted(re.escape(k) for k in POLICY_KEYWORDS if POLICY_KEYWORDS[k][0])))
+SKIP_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".json",
+                   ".xml", ".zip", ".gz", ".mp4", ".mp3", ".woff", ".woff2", ".ttf")
+DOCUMENT_EXTENSIONS = (".pdf", ".docx", ".txt")  # reported, but not fetched for links
+
+
+def score_link(url: str, anchor: str = ""):
+    """
+    (score, category) of a link from its path/query and anchor text.
+    """
+    parts = urlsplit(url)
+    path = unquote(f"{parts.path} {parts.query}").lower()
+    anchor = anchor.lower()
+    score, categories = 0, Counter()
+    for text, factor in ((path, 1), (anchor, ANCHOR_WEIGHT)):
+        if not text.strip():
+            continue
+        words = set(WORD_RE.findall(text))
+        for keyword, (category, weight) in POLICY_KEYWORDS.items():
+            if keyword in words or (len(keyword) >= 6 and keyword in text):
+                score += weight * factor
+                if category:
+                    categories[category] += weight * factor
+    return score, (categories.most_common(1)[0][0] if categories else None)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form for deduplication: lower-case scheme and host, no default
+    port, no fragment, "/" for an empty path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def _site_key(netloc: str) -> str:
+    host = netloc.lower().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+class DiscoveredPage:
+    """
+    A candidate policy page. verified is True once the page itself fetched OK.
+    """
+    __slots__ = ("url", "score", "category", "anchor", "depth", "source", "verified")
+
+    def __init__(self, url, score, category, anchor, depth, source):
+        self.url = url
+        self.score = score
+        self.category = category
+        self.anchor = anchor
+        self.depth = depth
+        self.source = source  # "link" or "sitemap"
+        self.verified = False
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self):
+        return f"DiscoveredPage({self.url!r}, {self.score}, {self.category!r})"
+
+
+class _Site:
+    def __init__(self, homepage: str):
+        if "://" not in homepage:
+            homepage = "https://" + homepage
+        self.home = normalize_url(homepage)
+        parts = urlsplit(self.home)
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.key = _site_key(parts.netloc)
+        self.robots = None
+        self.sitemaps = []
+        self.fetched = set()
+        self.candidates = {}
+
+    def allowed(self, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(ROBOTS_AGENT, url)
+
+    def add(self, url, anchor, depth, source):
+        url = normalize_url(url)
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or _site_key(parts.netloc) != self.key:
+            return
+        if parts.path.lower().endswith(SKIP_EXTENSIONS):
+            return
+        score, category = score_link(url, anchor)
+        if score < MIN_FOLLOW_SCORE or not self.allowed(url):
+            return
+        known = self.candidates.get(url)
+        if known is None:
+            self.candidates[url] = DiscoveredPage(url, score, category, anchor, depth, source)
+        elif score > known.score:
+            known.score, known.category, known.anchor = score, category, anchor
+
+    def next_batch(self, depth: int, budget: int) -> list:
+        pending = [c for c in self.candidates.values()
+                   if c.url not in self.fetched and c.depth <= depth
+                   and not urlsplit(c.url).path.lower().endswith(DOCUMENT_EXTENSIONS)]
+        pending.sort(key=lambda c: -c.score)
+        return [c.url for c in pending[:min(MAX_PAGES_PER_LEVEL, budget)]]
+
+    def ranked(self) -> list:
+        return sorted(self.candidates.values(), key=lambda c: (not c.verified, -c.score, c.depth, c.url))
+
+
+def _read_robots(site: _Site) -> None:
+    parser = RobotFileParser(site.origin + "/robots.txt")
+    try:
+        with fetch_stream(site.origin + "/robots.txt") as response:
+            status = response.status_code
+            body = response.raw.read(MAX_ROBOTS_BYTES, decode_content=True) if status == 200 else b""
+    except Exception:
+        status, body = None, b""
+    if status == 200:
+        parser.parse(body.decode("utf-8", errors="replace").splitlines())
+    elif status is not None and status >= 500:
+        parser.disallow_all = True  # server error: assume complete disallow (RFC 9309)
+    else:
+        parser.allow_all = True     # missing robots.txt or unreachable host
+    site.robots = parser
+    site.sitemaps = list(parser.site_maps() or []) or [site.origin + "/sitemap.xml"]
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read_sitemaps(site: _Site) -> list:
+    """
+    Stream the site's sitemaps (following sitemap indexes) and return the best
+    (score, url) entries. Elements are cleared as they are read, so memory stays
+    flat however large the sitemap is.
+    """
+    queue, read, urls_seen, best = list(site.sitemaps), 0, 0, []
+    while queue and read < MAX_SITEMAPS and urls_seen < MAX_SITEMAP_URLS:
+        sitemap_url = queue.pop(0)
+        if not site.allowed(sitemap_url):
+            continue
+        read += 1
+        try:
+            with fetch_stream(sitemap_url) as response:
+                if response.status_code != 200:
+                    continue
+                response.raw.decode_content = True
+                stream = response.raw
+                if sitemap_url.lower().endswith(".gz"):
+                    stream = gzip.GzipFile(fileobj=stream)
+                root, is_index = None, False
+                for event, elem in iterparse(stream, events=("start", "end")):
+                    if root is None:
+                        root, is_index = elem, _local(elem.tag) == "sitemapindex"
+                        continue
+                    if event != "end" or _local(elem.tag) != "loc":
+                        continue
+                    loc = (elem.text or "").strip()
+                    if is_index:
+                        queue.append(loc)
+                    else:
+                        urls_seen += 1
+                        score = score_link(loc)[0] if KEYWORD_RE.search(loc.lower()) else 0
+                        if score >= MIN_FOLLOW_SCORE:
+                            item = (score, loc)
+                            if len(best) < MAX_SITEMAP_CANDIDATES:
+                                heapq.heappush(best, item)
+                            else:
+                                heapq.heappushpop(best, item)
+                        if urls_seen >= MAX_SITEMAP_URLS:
+                            break
+                    root.clear()
+        except Exception:
+            continue  # malformed or unreachable sitemap: the link crawl still runs
+    return sorted(best, reverse=True)
+
+
+def _fetch_round(sites: list, urls_by_site: list, depth: int, follow_links: bool) -> int:
+    # One concurrent fetch for this round's pages of every site
+    batch = [(site, url) for site, urls in zip(sites, urls_by_site) for url in urls]
+    if not batch:
+        return 0
+    pages = fetch_pages([url for _, url in batch])
+    for site, url in batch:
+        site.fetched.add(url)
+        html = pages.get(url, "")
+        page = site.candidates.get(url)
+        if html.startswith(FETCH_ERROR_PREFIXES):
+            site.candidates.pop(url, None)  # broken links are not policy pages
+            continue
+        if page is not None:
+            page.verified = True
+        if follow_links:
+            for href, anchor in extract_links(html):
+                site.add(urljoin(url, href), anchor, depth + 1, "link")
+    return len(batch)
+
+
+def discover_policy_pages(homepages, max_depth: int = MAX_DEPTH, max_pages: int = MAX_PAGES_PER_SITE,
+                          use_sitemaps: bool = True, progress=None) -> dict:
+    """
+    Find privacy, cookie and terms pages for many sites at once.
+    Each site gets a bounded breadth-first crawl from its homepage that only
+    follows policy-scored links, plus its sitemap.xml, and robots.txt is obeyed
+    for both. Each BFS level of every site is fetched in one concurrent batch;
+    sitemaps are read in the background meanwhile and their best entries are
+    fetched in a final round, so every reported page was checked where budget allows.
+    Returns {homepage: [DiscoveredPage, ...]}, best first.
+    progress(stage, done, total) is called after each stage.
+    """
+    sites = list({site.home: site for site in (_Site(h) for h in homepages if h.strip())}.values())
+
+    def report(stage, done, total):
+        if progress is not None:
+            progress(stage, done, total)
+
+    with ThreadPoolExecutor(max_workers=SITE_THREADS) as pool:
+        list(pool.map(_read_robots, sites))
+    report("robots", len(sites), len(sites))
+
+    with ThreadPoolExecutor(max_workers=SITEMAP_THREADS) as sitemap_pool:
+        sitemap_jobs = [sitemap_pool.submit(_read_sitemaps, site) for site in sites] if use_sitemaps else []
+
+        for depth in range(max_depth + 1):
+            if depth == 0:
+                urls_by_site = [[site.home] if site.allowed(site.home) else [] for site in sites]
+            else:
+                urls_by_site = [site.next_batch(depth, max_pages - len(site.fetched)) for site in sites]
+            fetched = _fetch_round(sites, urls_by_site, depth, follow_links=depth < max_depth)
+            if not fetched:
+                break
+            report(f"depth {depth}", fetched, fetched)
+
+        if sitemap_jobs:
+            for site, job in zip(sites, sitemap_jobs):
+                for _, loc in job.result():
+                    site.add(loc, "", 1, "sitemap")
+            urls_by_site = [site.next_batch(max_depth, max_pages - len(site.fetched)) for site in sites]
+            fetched = _fetch_round(sites, urls_by_site, max_depth, follow_links=False)
+            report("sitemaps", fetched, fetched)
+
+    return {site.home: site.ranked() for site in sites}
+
+
+def best_pages(ranked: list, categories=CATEGORIES) -> list:
+    """
+    The top page per policy category from one site's ranked candidates.
+    """
+    chosen = {}
+    for page in ranked:
+        if page.category in categories and page.category not in chosen:
+            chosen[page.category] = page
+    return [chosen[c] for c in categories if c in chosen]
@@ -0,0 +1,98 @@
+# policysherlock/document_cache.py
+
+import os
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+DOC_CACHE_DIR = os.path.join("outputs", ".cache", "documents")
+DOC_CACHE_MAX_BYTES = 1024 * 1024 * 1024   # compressed bytes on disk
+DOC_CACHE_MAX_CHARS = 50_000_000           # extracted characters held in memory
+
+
+class DocumentCache:
+    """
+    Two-level cache of extracted upload text, keyed by content hash.
+    Each entry is a dict: {"text": str, "pages": [[page_no, start_offset], ...],
+    "chunks": [[start, end], ...]}. Memory is an LRU bounded by characters; disk
+    holds gzipped JSON files evicted least-recently-used past max_bytes.
+    """
+
+    def __init__(self, directory: str = DOC_CACHE_DIR, max_bytes: int = DOC_CACHE_MAX_BYTES,
+                 max_chars: int = DOC_CACHE_MAX_CHARS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self._memory = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used for disk eviction
+        except (OSError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        self._remember(key, entry)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self._evict_disk()
+
+    def _remember(self, key: str, entry: dict) -> None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = entry
+            self._chars += len(entry["text"])
+            while self._chars > self.max_chars and len(self._memory) > 1:
+                _, dropped = self._memory.popitem(last=False)
+                self._chars -= len(dropped["text"])
+
+    def _evict_disk(self) -> None:
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.gz"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_document_cache() -> DocumentCache:
+    """
+    Process-wide cache, so every tab and Streamlit session shares extractions.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DocumentCache()
+        return _default_cache
@@ -0,0 +1,175 @@
+# policysherlock/docx_extract.py
+
+import re
+import zipfile
+from io import BytesIO
+from xml.etree.ElementTree import iterparse
+
+try:
+    from lxml import etree
+except ImportError:  # stdlib iterparse sees every element, but works the same
+    etree = None
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+CONTAINERS = (W + "body", W + "hdr", W + "ftr", W + "footnotes", W + "endnotes")
+TEXT_BOX = W + "txbxContent"   # text box (or shape text) anchored in a paragraph, holding its own blocks
+FALLBACK = MC + "Fallback"     # VML copy of a drawing, repeating the text box of the mc:Choice before it
+BLOCK_TAGS = (W + "p", W + "tbl", W + "tr", W + "tc", W + "sdt", TEXT_BOX, FALLBACK) + CONTAINERS
+TEXT_TAGS = (W + "t", W + "tab", W + "br", W + "cr")
+# Read after the body: notes first, then running headers/footers
+EXTRA_PARTS = [r"word/footnotes\.xml", r"word/endnotes\.xml", r"word/header\d*\.xml", r"word/footer\d*\.xml"]
+
+
+def _events(stream):
+    if etree is not None:
+        # Let libxml2 skip runs, properties etc. and only report block-level tags
+        return etree.iterparse(stream, events=("start", "end"), tag=BLOCK_TAGS, huge_tree=True)
+    return iterparse(stream, events=("start", "end"))
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    nodes = p.iter(*TEXT_TAGS) if etree is not None else p.iter()
+    for node in nodes:
+        if node.tag == W + "t":
+            parts.append(node.text or "")
+        elif node.tag == W + "tab":
+            parts.append("\t")
+        elif node.tag in (W + "br", W + "cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _drop_finished(container, elem):
+    # Both parsers read ahead, so later siblings may already be attached:
+    # only drop the blocks before elem (elem itself is already cleared)
+    for i, child in enumerate(container):
+        if child is elem:
+            del container[:i]
+            return
+
+
+def _part_order(name: str) -> int:
+    # header2.xml before header10.xml
+    return int(re.search(r"(\d*)\.xml$", name).group(1) or 0)
+
+
+class _Story:
+    """
+    One flow of blocks: the part's own, or a text box's inside it.
+    out is None for the part's story (its blocks are yielded); a text box
+    collects its blocks so they can follow the paragraph holding it.
+    """
+    __slots__ = ("tables", "paragraph", "out")
+
+    def __init__(self, out=None):
+        self.tables = []        # stack of (row_cells, cell_paragraphs) for nested tables
+        self.paragraph = None   # blocks of text boxes inside the open w:p, emitted after it
+        self.out = out
+
+
+def _iter_part(stream):
+    """
+    Yield paragraph texts and table rows (cells joined with " | ") from one
+    WordprocessingML part in reading order; a text box's blocks come right
+    after the paragraph it is anchored in. Finished elements are cleared from
+    their container, so memory stays bounded by the largest single block.
+    """
+    stories = [_Story()]
+    container = None    # w:body / w:hdr / w:ftr / w:footnote... holding top-level blocks
+    skipped = 0         # depth inside mc:Fallback, whose text was already read from mc:Choice
+    sdts = 0            # depth inside w:sdt content controls
+    ready = []
+
+    def emit(story, block):
+        if story.out is not None:
+            story.out.append(block)
+        elif block:
+            ready.append(block)
+
+    for event, elem in _events(stream):
+        tag = elem.tag
+        if tag == FALLBACK:
+            skipped += 1 if event == "start" else -1
+            if event == "end":
+                elem.clear()
+            continue
+        if skipped:
+            continue
+        story = stories[-1]
+        tables = story.tables
+        if event == "start":
+            if container is None and tag in CONTAINERS:
+                container = elem
+            elif tag == TEXT_BOX:
+                stories.append(_Story([]))
+            elif tag == W + "p":
+                story.paragraph = []
+            elif tag == W + "sdt":
+                sdts += 1
+            elif tag == W + "tbl":
+                tables.append(None)
+            elif tag == W + "tr":
+                tables[-1] = ([], None)
+            elif tag == W + "tc":
+                tables[-1] = (tables[-1][0], [])
+            continue
+
+        if tag == TEXT_BOX:
+            stories.pop()
+            outer = stories[-1]
+            if outer.paragraph is not None:
+                outer.paragraph.extend(story.out)
+            else:
+                for block in story.out:
+                    emit(outer, block)
+            elem.clear()
+        elif tag == W + "p":
+            blocks = [_paragraph_text(elem)] + story.paragraph
+            story.paragraph = None
+            if tables and tables[-1] and tables[-1][1] is not None:
+                tables[-1][1].extend(blocks)
+            elif not tables:
+                for block in blocks:
+                    emit(story, block)
+            elem.clear()
+        elif tag == W + "tc":
+            cells, paragraphs = tables[-1]
+            cells.append(" ".join(t for t in paragraphs if t))
+            tables[-1] = (cells, None)
+        elif tag == W + "tr":
+            row = " | ".join(tables[-1][0])
+            tables[-1] = None
+            if len(tables) > 1 and tables[-2] and tables[-2][1] is not None:
+                tables[-2][1].append(row)  # nested table: row belongs to the outer cell
+            elif row.strip(" |"):
+                emit(story, row)
+        elif tag == W + "tbl":
+            tables.pop()
+            elem.clear()
+        elif tag == W + "sdt":
+            sdts -= 1
+            if len(stories) == 1 and not tables and not sdts and story.paragraph is None:
+                elem.clear()  # a block-level content control: its blocks are done
+
+        yield from ready
+        ready.clear()
+        if (container is not None and len(stories) == 1 and not tables and not sdts
+                and story.paragraph is None and tag in (W + "p", W + "tbl", W + "sdt")):
+            _drop_finished(container, elem)
+
+
+def iter_docx_text(data: bytes):
+    """
+    Stream the text of a .docx straight from its zip: body paragraphs and table
+    rows in reading order, then footnotes, endnotes, headers and footers.
+    """
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        names = archive.namelist()
+        with archive.open("word/document.xml") as stream:
+            yield from _iter_part(stream)
+        for pattern in EXTRA_PARTS:
+            for name in sorted((n for n in names if re.fullmatch(pattern, n)), key=_part_order):
+                with archive.open(name) as stream:
+                    yield from _iter_part(stream)
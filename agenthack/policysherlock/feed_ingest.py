@@ -0,0 +1,154 @@
+# policysherlock/feed_ingest.py
+
+import os
+import gzip
+import json
+import time
+from html import escape
+from urllib.parse import urlsplit
+
+from policysherlock.portia_client import get_portia_client
+
+# -----------------------
+# Config
+# -----------------------
+SCRAPYD_ITEMS_DIR = os.environ.get("SCRAPYD_ITEMS_DIR", "")  # Scrapyd's items_dir, when it runs on this machine
+FOLLOW_POLL_SECS = 0.5      # wait between reads at the end of a feed that is still being written
+URL_FIELDS = ("url", "_url", "page_url", "link")
+HTML_FIELDS = ("html", "body", "page", "content", "raw_html")  # full page markup, when the spider kept it
+SKIP_FIELDS = ("_type", "_template", "_index", "_job")
+FIELD_CHARS = 2000          # per extracted field when an item has no page markup
+
+
+def job_feed_source(job) -> str:
+    """
+    Where a Scrapyd job's items are: the local items_dir file when Scrapyd
+    shares this machine, otherwise the job's HTTP items URL.
+    """
+    if SCRAPYD_ITEMS_DIR:
+        path = os.path.join(SCRAPYD_ITEMS_DIR, job.project, job.spider, f"{job.job_id}.jl")
+        if os.path.exists(path):
+            return path
+    return job.items_url or ""
+
+
+def iter_feed_lines(source: str, follow=None):
+    """
+    Yield complete lines (bytes) from a JSON Lines feed: a local path (.gz
+    allowed), file:// or http(s) URL. Only the current line is held in memory.
+    With follow, a callable returning True while the writer (a running job)
+    is active, a local feed is tailed: at end of file the reader waits for
+    more, and a trailing partial line is only yielded once it is complete.
+    """
+    if source.startswith(("http://", "https://")):
+        client = get_portia_client()
+        with client.session.get(source, stream=True, timeout=client.timeout) as response:
+            if response.status_code != 200:
+                return
+            yield from response.iter_lines()
+        return
+    path = source[len("file://"):] if source.startswith("file://") else source
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        partial, draining = b"", False
+        while True:
+            line = f.readline()
+            if line.endswith(b"\n"):
+                yield partial + line.rstrip(b"\r\n")
+                partial = b""
+            elif line:
+                partial += line
+            elif follow is not None and not draining:
+                if follow():
+                    time.sleep(FOLLOW_POLL_SECS)
+                else:
+                    # The writer may have added lines between the empty read and follow()
+                    # turning False: read to the end once more before stopping
+                    draining = True
+            else:
+                if partial.strip():
+                    yield partial  # writer is done: the last line had no newline
+                return
+
+
+def iter_feed_items(source: str, follow=None):
+    """
+    Decoded items from a feed, in order. Lines that are not JSON objects
+    (a crawl killed mid-write) are skipped.
+    """
+    for line in iter_feed_lines(source, follow):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(item, dict):
+            yield item
+
+
+def _first(item: dict, fields) -> str:
+    for field in fields:
+        value = item.get(field)
+        if isinstance(value, list):
+            value = value[0] if value else ""
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+def _fields_html(url: str, item: dict) -> str:
+    # No page markup kept: lay the extracted fields out as a small page, so the
+    # feature, tracker and rule scans and the LLM still see what was scraped
+    parts = []
+    for key, value in item.items():
+        if key in SKIP_FIELDS or key in URL_FIELDS:
+            continue
+        text = " ".join(value) if isinstance(value, list) and all(isinstance(v, str) for v in value) else value
+        if not isinstance(text, str):
+            text = json.dumps(text, ensure_ascii=False)
+        parts.append(f"<section><h2>{escape(key)}</h2><p>{escape(text[:FIELD_CHARS])}</p></section>")
+    return f'<html><head><link rel="canonical" href="{escape(url)}"></head><body>{"".join(parts)}</body></html>'
+
+
+def item_url(item: dict) -> str:
+    return _first(item, URL_FIELDS)
+
+
+def item_html(item: dict) -> str:
+    """
+    The page markup the spider kept in the item, or "".
+    """
+    return _first(item, HTML_FIELDS)
+
+
+def normalize_item(item: dict, name_for=None):
+    """
+    (page_name, url, html, portia_summary) for one scraped item, in the shape
+    run_batch/audit_page take; None for items without a URL.
+    """
+    url = item_url(item)
+    if not url:
+        return None
+    html = item_html(item) or _fields_html(url, item)
+    summary = json.dumps({k: v for k, v in item.items() if k not in HTML_FIELDS}, ensure_ascii=False, default=str)
+    if name_for is not None:
+        name = name_for(url)
+    else:
+        parts = urlsplit(url)
+        name = f"{parts.netloc}{parts.path}".rstrip("/")
+    return name, url, html, summary
+
+
+def feed_entries(source: str, follow=None, name_for=None):
+    """
+    Audit entries from a Scrapyd item feed, one item at a time. Each URL is
+    yielded once (spiders often emit several items per page; the first wins).
+    """
+    seen = set()
+    for item in iter_feed_items(source, follow):
+        entry = normalize_item(item, name_for)
+        if entry is None or entry[1] in seen:
+            continue
+        seen.add(entry[1])
+        yield entry
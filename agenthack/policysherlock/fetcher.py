@@ -0,0 +1,142 @@
+# policysherlock/fetcher.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from policysherlock.http_cache import get_http_cache
+
+try:
+    import aiohttp
+except ImportError:  # fetch_pages falls back to the thread pool
+    aiohttp = None
+
+# -----------------------
+# Config
+# -----------------------
+FETCH_TIMEOUT = 10
+MAX_CONCURRENCY = 200      # pages in flight across all hosts
+MAX_PER_HOST = 8           # pages in flight per host
+MAX_REDIRECTS = 10
+FALLBACK_THREADS = 16
+USE_HTTP_CACHE = True      # revalidate against outputs/.cache instead of re-downloading
+DEFAULT_HEADERS = {
+    "User-Agent": "PolicySherlock/1.0 (privacy audit)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+}
+FETCH_ERROR_PREFIXES = ("Failed to fetch page", "Error fetching page")  # error strings returned in place of HTML
+
+# One keep-alive pool for every synchronous fetch in the process
+_session = requests.Session()
+_session.headers.update(DEFAULT_HEADERS)
+_session.max_redirects = MAX_REDIRECTS
+_adapter = HTTPAdapter(pool_connections=MAX_CONCURRENCY // MAX_PER_HOST, pool_maxsize=FALLBACK_THREADS)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+
+def _cached_entry(url: str):
+    """
+    Look up url in the HTTP cache.
+    Returns (cache, entry, request_headers); entry is None on a miss.
+    """
+    if not USE_HTTP_CACHE:
+        return None, None, {}
+    cache = get_http_cache()
+    entry = cache.get(url)
+    return cache, entry, (cache.conditional_headers(entry) if entry else {})
+
+
+def fetch_page(url: str) -> str:
+    """
+    Fetch a single page over the shared pooled session.
+    Cached pages are revalidated with a conditional GET and served locally on 304.
+    Returns the HTML, or an error string on failure.
+    """
+    cache, entry, headers = _cached_entry(url)
+    if entry and cache.is_fresh(entry):
+        return entry["body"]
+    try:
+        response = _session.get(url, timeout=FETCH_TIMEOUT, headers=headers)
+        if response.status_code == 304 and entry:
+            cache.revalidated(url)
+            return entry["body"]
+        if response.status_code == 200:
+            if cache:
+                cache.store(url, response.text, response.headers)
+            return response.text
+        return f"Failed to fetch page, status code {response.status_code}"
+    except Exception as e:
+        return f"Error fetching page: {e}"
+
+
+def fetch_stream(url: str):
+    """
+    Open url on the shared session without reading the body, for documents too
+    large to hold in memory (sitemaps). The caller closes the response.
+    """
+    return _session.get(url, timeout=FETCH_TIMEOUT, stream=True)
+
+
+# -----------------------
+# Async engine
+# -----------------------
+async def _fetch_one(session, url, global_limit, host_limits, max_per_host=MAX_PER_HOST):
+    host = urlsplit(url).hostname or ""
+    host_limit = host_limits.setdefault(host, asyncio.Semaphore(max_per_host))
+    # The cache is SQLite: its reads and writes run on worker threads, off the event loop
+    cache, entry, headers = await asyncio.to_thread(_cached_entry, url)
+    if entry and cache.is_fresh(entry):
+        return entry["body"]
+    # Gate before the request starts so the timeout only covers network time
+    async with global_limit, host_limit:
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True, max_redirects=MAX_REDIRECTS) as response:
+                if response.status == 304 and entry:
+                    await asyncio.to_thread(cache.revalidated, url)
+                    return entry["body"]
+                if response.status == 200:
+                    body = await response.text(errors="replace")
+                    if cache:
+                        await asyncio.to_thread(cache.store, url, body, response.headers)
+                    return body
+                return f"Failed to fetch page, status code {response.status}"
+        except Exception as e:
+            return f"Error fetching page: {e}"
+
+
+async def fetch_pages_async(urls, max_concurrency: int = MAX_CONCURRENCY, max_per_host: int = MAX_PER_HOST) -> dict:
+    """
+    Fetch many pages concurrently on one keep-alive connection pool.
+    Returns {url: html_or_error_string}.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=max_per_host, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits = {}
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout, headers=DEFAULT_HEADERS, auto_decompress=True
+    ) as session:
+        pages = await asyncio.gather(
+            *(_fetch_one(session, url, global_limit, host_limits, max_per_host) for url in unique_urls)
+        )
+    return dict(zip(unique_urls, pages))
+
+
+def fetch_pages(urls, use_async: bool = True) -> dict:
+    """
+    Fetch many pages and return {url: html_or_error_string}.
+    Uses the asyncio engine when aiohttp is installed, otherwise the pooled thread path.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    if use_async and aiohttp is not None:
+        return asyncio.run(fetch_pages_async(urls))
+    with ThreadPoolExecutor(max_workers=min(FALLBACK_THREADS, len(urls))) as executor:
+        return dict(zip(urls, executor.map(fetch_page, urls)))
@@ -0,0 +1,191 @@
+# policysherlock/html_features.py
+
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # fall back to the stdlib tokenizer
+    etree = None
+
+MAX_COOKIE_SNIPPETS = 5
+SNIPPET_CHARS = 200
+ANCHOR_CHARS = 200
+INLINE_SCRIPT_CHARS = 200_000  # inline <script> code kept per page for tracker snippet matching
+SCRIPT_CODE_TYPES = ("", "text/javascript", "application/javascript", "module")
+
+
+class _FeatureCollector:
+    """
+    Parser target that records privacy-relevant features as tags stream past.
+    Works as an lxml target and behind the stdlib HTMLParser adapter below.
+    """
+
+    def __init__(self):
+        self.forms = 0
+        self.inputs = []
+        self.script_srcs = []
+        self.iframes = []
+        self.pixels = []
+        self.img_srcs = []
+        self.link_hrefs = []
+        self.inline_scripts = []
+        self.cookie_snippets = []
+        self.cookie_text = False
+        self._inline = None  # chunks of the inline <script> being read
+        self._inline_chars = 0
+        self._tail = ""  # end of the previous chunk of the same text node, so words split by the parser still match
+
+    def start(self, tag, attrib):
+        self._tail = ""  # text on either side of a tag is never one word
+        tag = tag.lower()
+        if tag == "form":
+            self.forms += 1
+        elif tag == "input":
+            self.inputs.append({"type": (attrib.get("type") or "text").lower(), "name": attrib.get("name") or ""})
+        elif tag == "script":
+            if attrib.get("src"):
+                self.script_srcs.append(attrib["src"])
+            elif self._inline_chars < INLINE_SCRIPT_CHARS and \
+                    (attrib.get("type") or "").strip().lower() in SCRIPT_CODE_TYPES:
+                self._inline = []  # JSON, ld+json and template blocks are data, not code
+        elif tag == "iframe":
+            self.iframes.append(attrib.get("src") or "")
+        elif tag == "img":
+            if attrib.get("src"):
+                self.img_srcs.append(attrib["src"])
+            if (attrib.get("width") or "").strip() in ("0", "1") and (attrib.get("height") or "").strip() in ("0", "1"):
+                self.pixels.append(attrib.get("src") or "")
+        elif tag == "link":
+            if attrib.get("href"):
+                self.link_hrefs.append(attrib["href"])
+
+    def end(self, tag):
+        self._tail = ""
+        if self._inline is not None and tag.lower() == "script":
+            code = "".join(self._inline)[:INLINE_SCRIPT_CHARS - self._inline_chars]
+            if code.strip():
+                self.inline_scripts.append(code)
+                self._inline_chars += len(code)
+            self._inline = None
+
+    def data(self, text):
+        if self._inline is not None:
+            self._inline.append(text)
+        lowered = text.lower()
+        if "cookie" in lowered or "cookie" in (self._tail + lowered[:6]):
+            self.cookie_text = True
+            if len(self.cookie_snippets) < MAX_COOKIE_SNIPPETS:
+                snippet = " ".join(text.split())[:SNIPPET_CHARS]
+                if snippet:
+                    self.cookie_snippets.append(snippet)
+        self._tail = lowered[-6:]
+
+    def close(self):
+        return {
+            "forms": self.forms,
+            "inputs": self.inputs,
+            "script_srcs": self.script_srcs,
+            "iframes": self.iframes,
+            "pixels": self.pixels,
+            "img_srcs": self.img_srcs,
+            "link_hrefs": self.link_hrefs,
+            "inline_scripts": self.inline_scripts,
+            "cookie_text": self.cookie_text,
+            "cookie_snippets": self.cookie_snippets,
+        }
+
+
+class _LinkCollector:
+    """
+    Parser target that records (href, anchor text) for every <a href>.
+    """
+
+    def __init__(self):
+        self.links = []
+        self._href = None
+        self._text = []
+
+    def start(self, tag, attrib):
+        if tag.lower() == "a":
+            self._finish()
+            href = (attrib.get("href") or "").strip()
+            if href:
+                self._href = href
+                self._text = [attrib.get("title") or "", attrib.get("aria-label") or ""]
+        elif tag.lower() == "img" and self._href is not None:
+            self._text.append(attrib.get("alt") or "")
+
+    def end(self, tag):
+        if tag.lower() == "a":
+            self._finish()
+
+    def data(self, text):
+        if self._href is not None:
+            self._text.append(text)
+
+    def _finish(self):
+        if self._href is not None:
+            self.links.append((self._href, " ".join(" ".join(self._text).split())[:ANCHOR_CHARS]))
+            self._href = None
+
+    def close(self):
+        self._finish()
+        return self.links
+
+
+class _StdlibAdapter(HTMLParser):
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {k: (v or "") for k, v in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {k: (v or "") for k, v in attrs})
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def extract_features(html: str) -> dict:
+    """
+    Collect forms, inputs, script srcs and inline code, iframes, images (and
+    tracking pixels among them), <link> hrefs and cookie-related text in a
+    single streaming pass, without building a document tree.
+    Uses lxml's C parser when installed, otherwise the stdlib HTMLParser.
+    """
+    if etree is not None:
+        try:
+            parser = etree.HTMLParser(target=_FeatureCollector())
+            parser.feed(html)
+            return parser.close()
+        except (etree.Error, ValueError):
+            pass  # malformed input lxml refuses; retry on the forgiving tokenizer
+    collector = _FeatureCollector()
+    adapter = _StdlibAdapter(collector)
+    adapter.feed(html)
+    adapter.close()
+    return collector.close()
+
+
+def extract_links(html: str) -> list:
+    """
+    [(href, anchor_text)] for every link, in document order, from the same
+    streaming parse as extract_features(). hrefs are returned as written.
+    """
+    if etree is not None:
+        try:
+            parser = etree.HTMLParser(target=_LinkCollector())
+            parser.feed(html)
+            return parser.close()
+        except (etree.Error, ValueError):
+            pass
+    collector = _LinkCollector()
+    adapter = _StdlibAdapter(collector)
+    adapter.feed(html)
+    adapter.close()
+    return collector.close()
@@ -0,0 +1,131 @@
+# policysherlock/http_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+
+# -----------------------
+# Config
+# -----------------------
+HTTP_CACHE_PATH = os.path.join("outputs", ".cache", "http_cache.sqlite")
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+HTTP_CACHE_TTL = 0  # seconds to serve an entry without revalidating; 0 = always revalidate
+
+
+class HTTPCache:
+    """
+    On-disk page cache keyed by URL.
+    Stores the body with its ETag/Last-Modified validators so later fetches can
+    revalidate with a conditional GET, and evicts least-recently-used entries
+    once the stored bodies exceed max_bytes.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, max_bytes: int = HTTP_CACHE_MAX_BYTES, ttl: float = HTTP_CACHE_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed_at)")
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str):
+        """
+        Return the cached entry for url as a dict, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        body, etag, last_modified, stored_at = row
+        return {"body": body, "etag": etag, "last_modified": last_modified, "stored_at": stored_at}
+
+    def is_fresh(self, entry: dict) -> bool:
+        return self.ttl > 0 and time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, url: str):
+        """
+        Mark an entry fresh again after a 304 Not Modified.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE pages SET stored_at = ? WHERE url = ?", (time.time(), url))
+
+    def store(self, url: str, body: str, headers) -> None:
+        """
+        Store a 200 response body with its validators.
+        Responses marked no-store, or with no validators and no TTL, are skipped.
+        """
+        if "no-store" in (headers.get("Cache-Control") or "").lower():
+            return
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified or self.ttl > 0):
+            return
+
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, size, now, now),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Drop least-recently-used entries until we are back under budget
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+        doomed = []
+        for url, size in rows:
+            if self._total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._total = 0
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_http_cache() -> HTTPCache:
+    """
+    Process-wide cache shared by the CLI and every Streamlit session.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache()
+        return _default_cache
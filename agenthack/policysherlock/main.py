@@ -1,29 +1,38 @@
 import sys
 import os
 import re
-import requests
-from bs4 import BeautifulSoup
 import datetime
 import shutil
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich.console import Console
 from rich.table import Table
+from rich.markup import escape
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.csv_append_tool import append_row
+from tools.results_sink import ResultsSink
 from tools.file_writer_tool import write_file
 from policysherlock.policy_agent import analyze_policy
-from tools.ollama_agent import ask_ollama
+from tools.ollama_agent import ask_ollama, ask_ollama_stream, llm_cache_stats, is_ollama_error
+from policysherlock.fetcher import fetch_page, fetch_pages, FETCH_ERROR_PREFIXES
+from policysherlock.html_features import extract_features
+from policysherlock.trackers import get_tracker_db, summarize_trackers
+from policysherlock.portia_client import get_portia_client
+from policysherlock.clause_diff import diff_clauses, format_diff
+from policysherlock.audit_state import get_audit_state, content_fingerprint, privacy_fingerprint
 
 # -----------------------
 # Config
 # -----------------------
 OUTPUTS_ROOT = "outputs"
-OUTPUT_CSV_NAME = "data_inventory.csv"
+OUTPUT_RESULTS_NAME = "data_inventory"  # written as .csv, .jsonl and .parquet
 OUTPUT_POLICY_MD_NAME = "policy_gaps.md"
 MAX_RUNS_TO_KEEP = 5
-PORTIA_API_BASE = "http://localhost:9001"
+RUN_FOLDER_RE = re.compile(r"\d{8}_\d{6}")  # outputs/<timestamp> folders created by main()
 MAX_THREADS = 5
+USE_ASYNC_FETCH = True  # False = each audit thread fetches its own page
+STREAM_TO_CONSOLE = True  # print AI analysis line by line as it is generated
+INCREMENTAL_AUDIT = True  # reuse last run's results for pages whose content did not change
 
 console = Console()
 
@@ -36,30 +45,28 @@ def sanitize_name(name: str) -> str:
         sanitized = "default_name"
     return sanitized
 
-def fetch_page(url: str) -> str:
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            return response.text
-        return f"Failed to fetch page, status code {response.status_code}"
-    except Exception as e:
-        return f"Error fetching page: {e}"
+def detect_cookies_and_trackers(features: dict, url: str = ""):
+    """
+    Cookie-text flag and the number of distinct known trackers in
+    extract_features() output. Resources on the page's own site are not counted.
+    """
+    return features["cookie_text"], len(detect_trackers(features, url))
 
-def detect_cookies_and_trackers(soup: BeautifulSoup):
-    cookies = bool(soup.find(string=lambda s: s and "cookie" in s.lower()))
-    trackers = soup.find_all("script", src=True)
-    return cookies, len(trackers)
+def detect_trackers(features: dict, url: str = "") -> list:
+    """
+    Distinct trackers matched against the signature database (see trackers.py).
+    """
+    return summarize_trackers(get_tracker_db().classify(features, url))
 
 # -----------------------
 # Portia Helpers
 # -----------------------
 def create_portia_project(project_name: str) -> bool:
     try:
-        payload = {"name": project_name}
-        response = requests.post(f"{PORTIA_API_BASE}/api/projects", json=payload)
+        response = get_portia_client().create_project(project_name)
         if response.status_code in (200, 201):
             return True
-        elif response.status_code == 400 and "already exists" in str(response.json()).lower():
+        elif response.status_code == 400 and "already exists" in response.text.lower():
             return True  # project already exists
         else:
             console.print(f"[red]Failed to create project {project_name}: {response.text}[/red]")
@@ -70,11 +77,10 @@ def create_portia_project(project_name: str) -> bool:
 
 def create_portia_spider(project_name: str, spider_name: str) -> bool:
     try:
-        payload = {"name": spider_name}
-        response = requests.post(f"{PORTIA_API_BASE}/api/projects/{project_name}/spiders", json=payload)
+        response = get_portia_client().create_spider(project_name, spider_name)
         if response.status_code in (200, 201):
             return True
-        elif response.status_code == 400 and "already exists" in str(response.json()).lower():
+        elif response.status_code == 400 and "already exists" in response.text.lower():
             return True  # spider already exists
         else:
             console.print(f"[red]Failed to create spider {spider_name}: {response.text}[/red]")
@@ -84,33 +90,29 @@ def create_portia_spider(project_name: str, spider_name: str) -> bool:
         return False
 
 def list_portia_spiders(project_name):
-    url = f"http://localhost:9001/api/projects/{project_name}/spiders"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        spiders = [spider["id"] for spider in data.get("data", [])]
-        return spiders
-    else:
-        print("Error:", response.status_code, response.text)
+    try:
+        return get_portia_client().list_spiders(project_name)
+    except Exception as e:
+        console.print(f"[red]Error listing spiders: {e}[/red]")
         return []
 
 def get_portia_data(url: str, project_name: str, spider_name: str):
+    # Samples are per spider, not per page: the shared client fetches them once per run
     try:
-        api_url = f"{PORTIA_API_BASE}/api/projects/{project_name}/spiders/{spider_name}/samples"
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = get_portia_client().get_samples(project_name, spider_name, context=True)
+        if status == 200:
             return str(data)[:200] if isinstance(data, (dict, list)) else str(data)
-        elif response.status_code == 404:
+        elif status == 404:
             return "No Portia samples available yet."
-        return f"Failed to fetch Portia data, status: {response.status_code}"
+        return f"Failed to fetch Portia data, status: {status}"
     except Exception as e:
         return f"Portia error: {e}"
 
 def cleanup_old_outputs():
     if os.path.exists(OUTPUTS_ROOT):
         all_runs = sorted(
-            [os.path.join(OUTPUTS_ROOT, d) for d in os.listdir(OUTPUTS_ROOT)],
+            # Only timestamped run folders: leave .cache/ and batch_* folders alone
+            [os.path.join(OUTPUTS_ROOT, d) for d in os.listdir(OUTPUTS_ROOT) if RUN_FOLDER_RE.fullmatch(d)],
             key=os.path.getmtime,
             reverse=True
         )
@@ -120,12 +122,28 @@ def cleanup_old_outputs():
 # -----------------------
 # AI Helpers
 # -----------------------
+def stream_to_console(page_name: str, tokens) -> str:
+    """
+    Print streamed tokens as whole lines prefixed with the page name, so parallel
+    audits don't interleave mid-line. Returns the full text.
+    """
+    parts, line = [], ""
+    for token in tokens:
+        parts.append(token)
+        line += token
+        while "\n" in line:
+            done, line = line.split("\n", 1)
+            console.print(f"[dim]{escape(page_name)} ›[/dim] {escape(done)}")
+    if line:
+        console.print(f"[dim]{escape(page_name)} ›[/dim] {escape(line)}")
+    return "".join(parts)
+
 def summarize_policy(policy_text: str) -> str:
     return policy_text[:200] + "..." if len(policy_text) > 200 else policy_text
 
 def compare_policies(policy_a: str, policy_b: str) -> str:
-    diff = set(policy_a.split()) ^ set(policy_b.split())
-    return "Differences: " + ", ".join(list(diff)[:20]) + "..."
+    diff = diff_clauses(policy_a, policy_b)
+    return f"Differences: {diff.summary()}\n" + format_diff(diff, max_chars=2000)
 
 def detect_bias(policy_text: str) -> str:
     if "unlimited" in policy_text.lower():
@@ -135,24 +153,84 @@ def detect_bias(policy_text: str) -> str:
 # -----------------------
 # Audit Function
 # -----------------------
-def audit_page(page_name: str, url: str, output_csv: str, output_folder: str, project_name: str, spider_name: str):
-    console.print(f"\n[bold cyan]🔎 Auditing {url} ...[/bold cyan]")
-    page_html = fetch_page(url)
-    soup = BeautifulSoup(page_html, "html.parser")
-
-    form_count = len(soup.find_all("form"))
-    input_count = len(soup.find_all("input"))
-    cookies_present, tracker_count = detect_cookies_and_trackers(soup)
+def failed_audit(page_name: str, url: str, error: str) -> dict:
+    """
+    Result of an audit that could not complete. Nothing is written for it:
+    no row, no report and no audit state, so the next run retries the page.
+    """
+    console.print(f"[red]{escape(page_name)}: {escape(error[:200])}[/red]")
+    return {
+        "Page": page_name,
+        "URL": url,
+        "Forms": 0,
+        "Inputs": 0,
+        "Cookies": "No",
+        "Trackers": 0,
+        "Ollama": error[:50] + "...",
+        "Portia": "",
+        "Status": "failed",
+        "Error": error,
+    }
 
-    prompt = f"""
+def audit_page(page_name: str, url: str, results: ResultsSink, output_folder: str, project_name: str, spider_name: str, page_html: str = None, portia_summary: str = None):
+    console.print(f"\n[bold cyan]🔎 Auditing {url} ...[/bold cyan]")
+    if page_html is None:
+        page_html = fetch_page(url)
+    if page_html.startswith(FETCH_ERROR_PREFIXES):
+        return failed_audit(page_name, url, page_html)
+
+    state = get_audit_state() if INCREMENTAL_AUDIT else None
+    prior = state.get(url) if state else None
+    content_hash = content_fingerprint(page_html)
+
+    tracker_db = get_tracker_db().digest
+    # Reuse prior metrics only if they were counted against the current signature database
+    if prior and prior["content_hash"] == content_hash and prior["metrics"].get("tracker_db") == tracker_db:
+        status = "unchanged"
+        metrics = prior["metrics"]
+        ai_analysis = prior["ai_analysis"]
+    else:
+        features = extract_features(page_html)
+        trackers = detect_trackers(features, url)
+        metrics = {
+            "forms": features["forms"],
+            "inputs": len(features["inputs"]),
+            "cookies": features["cookie_text"],
+            "trackers": len(trackers),
+            "tracker_names": [t.name for t in trackers],
+            "tracker_db": tracker_db,
+        }
+        privacy_hash = privacy_fingerprint(features, page_html, url) if state else ""
+        if prior and prior["privacy_hash"] == privacy_hash:
+            status = "privacy-unchanged"
+            ai_analysis = prior["ai_analysis"]
+        else:
+            status = "analyzed"
+            prompt = f"""
     Analyze the following HTML page for data collection, forms, cookies, trackers, and privacy issues.
     Mention forms, inputs, cookies banners, trackers, and any potential privacy gaps.
 
+    Known trackers detected: {", ".join(metrics["tracker_names"]) or "none"}
+
     HTML:
     {page_html[:5000]}
     """
-    ai_analysis = ask_ollama(prompt)
-    portia_summary = get_portia_data(url, project_name, spider_name)
+            if STREAM_TO_CONSOLE:
+                ai_analysis = stream_to_console(page_name, ask_ollama_stream(prompt))
+            else:
+                ai_analysis = ask_ollama(prompt)
+        if is_ollama_error(ai_analysis):
+            return failed_audit(page_name, url, ai_analysis)
+        if state:
+            state.put(url, content_hash, privacy_hash, metrics, ai_analysis)
+    if status != "analyzed":
+        console.print(f"[dim]{escape(page_name)}: {status} since last audit, reusing AI analysis[/dim]")
+
+    form_count = metrics["forms"]
+    input_count = metrics["inputs"]
+    cookies_present, tracker_count = metrics["cookies"], metrics["trackers"]
+    if portia_summary is None:  # pages from a Scrapyd item feed bring their own item
+        portia_summary = get_portia_data(url, project_name, spider_name)
 
     row = [
         page_name,
@@ -164,8 +242,7 @@ def audit_page(page_name: str, url: str, output_csv: str, output_folder: str, pr
         ai_analysis[:200],
         portia_summary[:200]
     ]
-    msg = append_row(output_csv, row)
-    console.print(f"[green]{msg}[/green]")
+    results.write(row)
 
     page_md_path = os.path.join(output_folder, f"{page_name}_analysis.md")
     write_file(page_md_path, ai_analysis)
@@ -178,7 +255,8 @@ def audit_page(page_name: str, url: str, output_csv: str, output_folder: str, pr
         "Cookies": "Yes" if cookies_present else "No",
         "Trackers": tracker_count,
         "Ollama": ai_analysis[:50] + "...",
-        "Portia": portia_summary[:50] + "..."
+        "Portia": portia_summary[:50] + "...",
+        "Status": status
     }
 
 # -----------------------
@@ -214,7 +292,7 @@ def main():
     output_folder = os.path.join(OUTPUTS_ROOT, timestamp)
     os.makedirs(output_folder, exist_ok=True)
 
-    output_csv = os.path.join(output_folder, OUTPUT_CSV_NAME)
+    results = ResultsSink(os.path.join(output_folder, OUTPUT_RESULTS_NAME))
     output_policy_md = os.path.join(output_folder, OUTPUT_POLICY_MD_NAME)
 
     # ---- Pages input ----
@@ -230,13 +308,21 @@ def main():
     for col in ["Page", "URL", "Forms", "Inputs", "Cookies", "Trackers", "Ollama", "Portia"]:
         table.add_column(col, style="cyan")
 
+    # ---- Fetch all pages up front on the async engine ----
+    prefetched = {}
+    if USE_ASYNC_FETCH:
+        with console.status("[cyan]Fetching pages...[/cyan]"):
+            prefetched = fetch_pages([url for _, url in pages_to_audit])
+
     with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
         future_to_page = {
-            executor.submit(audit_page, page_name, url, output_csv, output_folder, project_name, spider_name): (page_name, url)
+            executor.submit(audit_page, page_name, url, results, output_folder, project_name, spider_name, prefetched.get(url)): (page_name, url)
             for page_name, url in pages_to_audit
         }
+        statuses = Counter()
         for future in as_completed(future_to_page):
             result = future.result()
+            statuses[result["Status"]] += 1
             table.add_row(
                 result["Page"], result["URL"], str(result["Forms"]),
                 str(result["Inputs"]), result["Cookies"], str(result["Trackers"]),
@@ -244,6 +330,12 @@ def main():
             )
             console.clear()
             console.print(table)
+    console.print(f"[green]{results.close()}[/green]")
+    if INCREMENTAL_AUDIT:
+        console.print(
+            f"[dim]Incremental audit: {statuses['analyzed']} analyzed, {statuses['privacy-unchanged']} "
+            f"with unchanged privacy content, {statuses['unchanged']} unchanged, {statuses['failed']} failed[/dim]"
+        )
 
     # ---- Policy analysis ----
     sample_policy_text = """
@@ -253,6 +345,11 @@ def main():
     write_file(output_policy_md, policy_analysis)
     console.print(f"\n✅ Policy analysis saved to {output_policy_md}")
     console.print(f"✅ All page analyses and CSV summary saved in {output_folder}")
+    stats = llm_cache_stats()
+    console.print(
+        f"[dim]LLM cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%}), {stats['entries']} entries stored[/dim]"
+    )
 
 if __name__ == "__main__":
     main()
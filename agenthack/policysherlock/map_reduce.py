@@ -0,0 +1,183 @@
+# policysherlock/map_reduce.py
+
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.ollama_agent import ask_ollama, is_ollama_error
+from tools.llm_scheduler import INTERACTIVE, LLM_PARALLELISM
+from policysherlock.portia_integration import _safe_json_parse
+from policysherlock.policy_analysis import SECTION_PROMPTS, _as_bullets
+from policysherlock.text_utils import PARAGRAPH_RE, chunk_spans
+
+PART_MIN_CHARS = 3000
+PART_MAX_CHARS = 6000   # same per-prompt budget the single-shot analysis used
+CUT_MASK = 0x3          # past PART_MIN_CHARS, cut after ~1 in 4 paragraphs (chosen by content hash)
+REDUCE_FANOUT = 4       # average number of partial results merged per reduce prompt
+
+MAP_PROMPT = """Below is one part of a longer policy. Analyze this part only.
+Return ONLY valid JSON (no markdown, no backticks) with these keys:
+{{
+  "summary": string,   // 2-4 sentences: scope, obligations, data handling, user rights in this part
+  "risks": [string],   // risks, loopholes or non-compliance gaps, each prefixed with (Low/Medium/High), max 6
+  "clauses": [string]  // most important clauses or definitions in this part, short, max 6
+}}
+
+Policy part:
+{text}
+"""
+
+REDUCE_PROMPT = """Below are JSON analyses of consecutive parts of one policy, in document order.
+Merge them into one analysis of the whole. Remove duplicates and keep the most severe rating
+when the same risk appears twice. Return ONLY valid JSON (no markdown, no backticks) with these keys:
+{{
+  "summary": string,   // concise executive summary: scope, obligations, data handling, user rights
+  "risks": [string],   // each prefixed with (Low/Medium/High), max 12
+  "clauses": [string]  // short, max 12
+}}
+
+Partial analyses:
+{parts}
+"""
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def _pieces(text: str):
+    # Paragraphs, with any paragraph longer than a part split on sentences
+    pos = 0
+    ends = [m.end() for m in PARAGRAPH_RE.finditer(text)] + [len(text)]
+    for end in ends:
+        if end <= pos:
+            continue
+        if end - pos > PART_MAX_CHARS:
+            for span in chunk_spans(text[pos:end], max_chars=PART_MAX_CHARS, overlap=0):
+                yield pos + span.start, pos + span.end
+        else:
+            yield pos, end
+        pos = end
+
+
+def split_parts(text: str) -> list:
+    """
+    Split a document into (start, end) parts of at most PART_MAX_CHARS on
+    paragraph boundaries. Cut points are chosen by hashing paragraph content
+    rather than by position, so an edit only changes the part it falls in
+    (and at most its neighbour); the other parts keep the same text and hash.
+    """
+    parts, start, end = [], None, None
+    for piece_start, piece_end in _pieces(text):
+        if start is not None and piece_end - start > PART_MAX_CHARS:
+            parts.append((start, end))
+            start = None
+        if start is None:
+            start = piece_start
+        end = piece_end
+        if end - start >= PART_MIN_CHARS and _digest(text[piece_start:piece_end])[0] & CUT_MASK == 0:
+            parts.append((start, end))
+            start = None
+    if start is not None and text[start:end].strip():
+        parts.append((start, end))
+    return parts
+
+
+def _as_lists(data: dict) -> dict:
+    result = {"summary": str(data.get("summary") or "")}
+    for section in ("risks", "clauses"):
+        value = data.get(section) or []
+        result[section] = value if isinstance(value, list) else [str(value)]
+    return result
+
+
+def _merge_locally(partials: list) -> dict:
+    # Used when the model breaks the reduce JSON: nothing is lost, just not condensed
+    return {
+        "summary": "\n\n".join(p["summary"] for p in partials if p["summary"]),
+        "risks": [item for p in partials for item in p["risks"]],
+        "clauses": [item for p in partials for item in p["clauses"]],
+    }
+
+
+def _group(nodes: list) -> list:
+    # Group boundaries also come from content hashes, so unchanged runs of parts
+    # form the same groups (and the same reduce prompts) after an edit elsewhere
+    groups, current = [], []
+    for node in nodes:
+        current.append(node)
+        if len(current) >= 2 * REDUCE_FANOUT or (len(current) >= 2 and node[0][0] % REDUCE_FANOUT == 0):
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def analyze_long_document(text: str, priority: int = INTERACTIVE, session: str = "default",
+                          use_cache: bool = True, progress=None) -> dict:
+    """
+    Map-reduce analysis of a whole document: {"summary": ..., "risks": ..., "clauses": ...}.
+    Each part is analyzed in parallel, then partial results are merged in a tree
+    of reduce prompts. Every prompt is deterministic in its part text (or its
+    children's results), so the LLM cache keeps each partial result keyed by
+    content: after editing one section only that part's map step and the reduce
+    steps above it run again.
+    progress(stage, done, total) is called as map and reduce prompts finish,
+    and once as ("failed", failed, total) if the model failed on some parts:
+    those are left out of the result. Raises RuntimeError if it failed on all.
+    A reduce the model fails on is merged locally instead.
+    """
+    def report(stage, done, total):
+        if progress is not None:
+            progress(stage, done, total)
+
+    def map_part(span):
+        raw = ask_ollama(MAP_PROMPT.format(text=text[span[0]:span[1]]),
+                         use_cache=use_cache, priority=priority, session=session)
+        if is_ollama_error(raw):
+            errors.append(raw)
+            return None
+        data = _safe_json_parse(raw)
+        if "raw_ai" in data:
+            return {"summary": data["raw_ai"].strip(), "risks": [], "clauses": []}
+        return _as_lists(data)
+
+    def reduce_group(group):
+        partials = [result for _, result in group]
+        if len(partials) == 1:
+            return partials[0]
+        raw = ask_ollama(REDUCE_PROMPT.format(parts="\n".join(json.dumps(p, ensure_ascii=False) for p in partials)),
+                         use_cache=use_cache, priority=priority, session=session)
+        if is_ollama_error(raw):
+            return _merge_locally(partials)
+        data = _safe_json_parse(raw)
+        return _merge_locally(partials) if "raw_ai" in data else _as_lists(data)
+
+    spans = split_parts(text)
+    if not spans:
+        return {section: "" for section in SECTION_PROMPTS}
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, LLM_PARALLELISM)) as pool:
+        nodes = []
+        for i, result in enumerate(pool.map(map_part, spans)):
+            if result is not None:
+                nodes.append((_digest(text[spans[i][0]:spans[i][1]]), result))
+            report("map", i + 1, len(spans))
+        if not nodes:
+            raise RuntimeError(errors[0])
+        if errors:
+            report("failed", len(errors), len(spans))
+
+        level = 0
+        while len(nodes) > 1:
+            level += 1
+            groups = _group(nodes)
+            nodes = []
+            for i, result in enumerate(pool.map(reduce_group, groups)):
+                nodes.append((_digest("".join(key.hex() for key, _ in groups[i])), result))
+                report(f"reduce {level}", i + 1, len(groups))
+
+    final = nodes[0][1]
+    return {section: _as_bullets(final.get(section)) for section in SECTION_PROMPTS}
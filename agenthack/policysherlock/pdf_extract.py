@@ -0,0 +1,95 @@
+# policysherlock/pdf_extract.py
+
+import os
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from io import BytesIO
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+PDF_WORKERS = os.cpu_count() or 1
+PAGES_PER_TASK = 8
+PARALLEL_MIN_PAGES = 32  # below this, handing pages to the pool costs more than it saves
+WORKER_READERS = 4       # parsed PDFs each worker keeps, for documents extracted at the same time
+# Never fork: the app's other threads may hold locks a forked child would inherit, locked, forever
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_readers = OrderedDict()  # in each worker: PDF path -> PdfReader
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # One pool for the process, started on first use and shared by every session
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context(START_METHOD))
+        return _pool
+
+
+def _reset_pool(pool) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_range(path: str, start: int, stop: int) -> list:
+    # Each worker parses a PDF once and keeps it for all its page ranges
+    reader = _worker_readers.pop(path, None) or PyPDF2.PdfReader(path)
+    _worker_readers[path] = reader
+    while len(_worker_readers) > WORKER_READERS:
+        _worker_readers.popitem(last=False)
+    return [(n + 1, reader.pages[n].extract_text() or "") for n in range(start, stop)]
+
+
+def iter_pdf_pages(data: bytes, workers: int = PDF_WORKERS):
+    """
+    Yield (page_no, text) for every page, in page order, as soon as each is ready.
+    Large documents are split into page ranges extracted across the shared
+    process pool, at most `workers` ranges at a time, so later ranges keep
+    extracting while the caller consumes earlier pages. If the pool breaks,
+    the rest is extracted in this thread.
+    """
+    reader = PyPDF2.PdfReader(BytesIO(data))
+    page_count = len(reader.pages)
+    next_page = 0
+    if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+        # Workers read the PDF from a temporary file instead of receiving the bytes with every task
+        # (the content hash in the name keeps workers' cached readers from matching a reused name)
+        fd, path = tempfile.mkstemp(prefix=hashlib.sha1(data).hexdigest()[:16] + "_", suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        pool, futures = _get_pool(), deque()
+        starts = iter(range(0, page_count, PAGES_PER_TASK))
+
+        def submit_next():
+            start = next(starts, None)
+            if start is not None:
+                futures.append(pool.submit(_extract_range, path, start, min(start + PAGES_PER_TASK, page_count)))
+
+        try:
+            for _ in range(min(workers, PDF_WORKERS)):
+                submit_next()
+            while futures:
+                pages = futures.popleft().result()
+                submit_next()  # keep `workers` ranges in flight while these pages are consumed
+                for page in pages:
+                    yield page
+                    next_page = page[0]
+        except BrokenProcessPool:
+            _reset_pool(pool)
+        finally:
+            # Don't keep extracting if the caller stopped early
+            for future in futures:
+                future.cancel()
+            os.remove(path)
+    for n in range(next_page, page_count):
+        yield n + 1, reader.pages[n].extract_text() or ""
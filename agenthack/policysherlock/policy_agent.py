@@ -1,27 +1,34 @@
 # policysherlock/policy_agent.py
 
-import re
+from collections import OrderedDict
 
-def analyze_policy(text: str) -> str:
+from policysherlock.rule_engine import get_rule_pack
+
+
+def scan_policy(text: str, pack=None) -> list:
+    """
+    All rule-pack hits in a policy text, ordered by offset.
+    """
+    return (pack or get_rule_pack()).scan(text)
+
+
+def analyze_policy(text: str, pack=None) -> str:
     """
     Very basic demo tool that 'analyzes' a given policy or legal-like text.
-    It checks for keywords like 'data', 'privacy', 'liability' etc. and returns insights.
+    Scans it once with the compiled rule pack and returns one insight per rule
+    that matched, with its severity and how often it matched.
     """
+    pack = pack or get_rule_pack()
+    matched = OrderedDict((rule.id, []) for rule in pack.rules)
+    for hit in pack.scan(text):
+        matched[hit.rule.id].append(hit)
 
     issues = []
+    for rule in pack.rules:
+        hits = matched[rule.id]
+        if hits:
+            issues.append(f"[{rule.severity}] {rule.message} ({len(hits)}x)")
 
-    if re.search(r"\bdata\b", text, re.IGNORECASE):
-        issues.append("Mentions 'data' → possible privacy implications.")
-    
-    if re.search(r"\bprivacy\b", text, re.IGNORECASE):
-        issues.append("Mentions 'privacy' → check GDPR/DPDP Act compliance.")
-    
-    if re.search(r"\bliability\b", text, re.IGNORECASE):
-        issues.append("Mentions 'liability' → check contractual obligations.")
-    
-    if re.search(r"\btermination\b", text, re.IGNORECASE):
-        issues.append("Mentions 'termination' → review conditions for fairness.")
-    
     if not issues:
         return "No specific risks detected in this text."
 
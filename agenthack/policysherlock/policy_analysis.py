@@ -0,0 +1,90 @@
+# policysherlock/policy_analysis.py
+
+import queue
+import threading
+
+from tools.ollama_agent import ask_ollama, ask_ollama_stream
+from tools.llm_scheduler import INTERACTIVE
+from policysherlock.portia_integration import _safe_json_parse
+
+SECTION_PROMPTS = {
+    "summary": "Provide a concise executive summary. Focus on scope, obligations, data handling, and user rights.",
+    "risks": "List risks, loopholes or non-compliance gaps with severity (Low/Medium/High). Max 12 bullets.",
+    "clauses": "Extract the most important clauses or definitions as bullets (max 12). Be short.",
+}
+
+STRUCTURED_PROMPT = """Analyze the policy below. Return ONLY valid JSON (no markdown, no backticks) with these keys:
+{{
+  "summary": string,   // concise executive summary: scope, obligations, data handling, user rights
+  "risks": [string],   // risks, loopholes or non-compliance gaps, each prefixed with (Low/Medium/High), max 12
+  "clauses": [string]  // most important clauses or definitions, short, max 12
+}}
+
+Policy:
+{text}
+"""
+
+
+def stream_sections(text: str, priority: int = INTERACTIVE, session: str = "default", use_cache: bool = True):
+    """
+    Generate summary, risks and key clauses concurrently.
+    Yields (section, token) as tokens arrive from any of the three, and
+    (section, None) once that section is complete. Closing or dropping the
+    generator (e.g. a Streamlit rerun) stops all three: each pump closes its
+    stream at its next token, which cancels the generation.
+    """
+    events = queue.Queue()
+    stop = threading.Event()
+
+    def pump(section, prompt):
+        tokens = ask_ollama_stream(f"{prompt}\n\n{text}", use_cache=use_cache, priority=priority, session=session)
+        try:
+            for token in tokens:
+                if stop.is_set():
+                    return
+                events.put((section, token))
+            events.put((section, None))
+        finally:
+            tokens.close()
+
+    for section, prompt in SECTION_PROMPTS.items():
+        threading.Thread(target=pump, args=(section, prompt), daemon=True).start()
+
+    try:
+        remaining = len(SECTION_PROMPTS)
+        while remaining:
+            section, token = events.get()
+            if token is None:
+                remaining -= 1
+            yield section, token
+    finally:
+        stop.set()
+
+
+def analyze_sections(text: str, priority: int = INTERACTIVE, session: str = "default", use_cache: bool = True) -> dict:
+    """
+    Concurrent mode, collected: {"summary": ..., "risks": ..., "clauses": ...}.
+    """
+    results = {section: "" for section in SECTION_PROMPTS}
+    for section, token in stream_sections(text, priority, session, use_cache):
+        if token is not None:
+            results[section] += token
+    return results
+
+
+def _as_bullets(value) -> str:
+    if isinstance(value, list):
+        return "\n".join(f"- {item}" for item in value)
+    return str(value or "")
+
+
+def analyze_sections_structured(text: str, priority: int = INTERACTIVE, session: str = "default", use_cache: bool = True) -> dict:
+    """
+    Single-generation mode: one JSON completion holding all three sections.
+    Falls back to the raw answer as the summary if the model breaks the JSON.
+    """
+    raw = ask_ollama(STRUCTURED_PROMPT.format(text=text), use_cache=use_cache, priority=priority, session=session)
+    data = _safe_json_parse(raw)
+    if "raw_ai" in data:
+        return {"summary": data["raw_ai"], "risks": "", "clauses": ""}
+    return {section: _as_bullets(data.get(section)) for section in SECTION_PROMPTS}
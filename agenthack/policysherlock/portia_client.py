@@ -0,0 +1,251 @@
+# policysherlock/portia_client.py
+
+import os
+import copy
+import time
+import threading
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# -----------------------
+# Config
+# -----------------------
+PORTIA_URL = os.environ.get("PORTIA_URL", "http://localhost:9001")
+SCRAPYD_URL = os.environ.get("SCRAPYD_URL", "http://localhost:6800")
+CONNECT_TIMEOUT = 3        # seconds to open a connection
+READ_TIMEOUT = 10          # seconds to wait for a response
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5       # sleeps 0.5s, 1s, 2s between attempts
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 16             # kept-alive connections per host; audit threads share them
+CONTEXT_TIMEOUT = (1, 5)   # (connect, read) for lookups that only add context to an audit; no retries
+DOWN_SECS = 30             # after a connection failure, calls to that service fail at once for this long
+
+
+class PortiaClient:
+    """
+    One pooled, retrying HTTP client for the Portia API and Scrapyd.
+    Every call has a (connect, read) timeout. Connection failures are retried
+    with exponential backoff for any method; 5xx/429 responses and read
+    timeouts only for GETs, so a POST that may have reached the server (a
+    schedule.json, a new sample) is never sent twice.
+    GET lookups (projects, spiders, samples) are memoized until clear_cache():
+    concurrent callers asking for the same thing share one request, and a
+    write to Portia drops the memoized Portia lookups so the next read sees it.
+    for_run() gives a run (a Streamlit rerun) its own memo over the same
+    connections, so runs never clear each other's lookups.
+    A service that refused or dropped a connection is marked down: calls to
+    it fail at once for DOWN_SECS, instead of each waiting out its own
+    timeouts and retries.
+    """
+
+    def __init__(self, portia_url: str = PORTIA_URL, scrapyd_url: str = SCRAPYD_URL,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries: int = MAX_RETRIES):
+        self.portia_url = portia_url.rstrip("/")
+        self.scrapyd_url = scrapyd_url.rstrip("/")
+        self.timeout = timeout
+        retry = Retry(
+            total=retries, connect=retries, read=retries, status=retries,
+            backoff_factor=BACKOFF_FACTOR, status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Health probes and retry=False calls answer once, without the retry backoff
+        self._probe = requests.Session()
+        self._probe.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=0))
+        self._probe.mount("https://", HTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=0))
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        # Shared with every for_run() copy
+        self._down = {}  # service base URL -> (monotonic time it may be tried again, error)
+        self._writes = [0]  # writes to Portia, so caches of its listings can tell they are stale
+        self._lock = threading.Lock()
+
+    def for_run(self) -> "PortiaClient":
+        """
+        A client for one run: same connections, down marks and write count, empty memo.
+        """
+        run = copy.copy(self)
+        run._memo = {}
+        run._memo_lock = threading.Lock()
+        return run
+
+    @property
+    def portia_writes(self) -> int:
+        return self._writes[0]
+
+    # ---- transport ----
+    def request(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        retry=False sends the call once, without the retry backoff.
+        """
+        base = self.portia_url if url.startswith(self.portia_url) else \
+            self.scrapyd_url if url.startswith(self.scrapyd_url) else None
+        down = self._down.get(base)
+        if down is not None:
+            if time.monotonic() < down[0]:
+                raise requests.ConnectionError(f"{base} is marked down: {down[1]}")
+            with self._lock:
+                self._down.pop(base, None)
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = (self.session if retry else self._probe).request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            if base is not None:
+                with self._lock:
+                    self._down[base] = (time.monotonic() + DOWN_SECS, e)
+            raise
+        if method != "GET" and base == self.portia_url:
+            with self._lock:
+                self._writes[0] += 1
+            self.clear_cache(self.portia_url)
+        return response
+
+    def get_json(self, url: str, params: dict = None, memo: bool = True, retry: bool = True, timeout=None):
+        """
+        (status_code, parsed JSON or None) for a GET. 200 and 404 answers are
+        memoized; errors and other statuses are not, so they are retried later.
+        retry/timeout apply to the request actually sent (see request()).
+        """
+        if not memo:
+            return self._get_json(url, params, retry, timeout)
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._memo_lock:
+            future = self._memo.get(key)
+            owner = future is None
+            if owner:
+                future = self._memo[key] = Future()
+        if owner:
+            try:
+                result = self._get_json(url, params, retry, timeout)
+            except Exception as e:
+                with self._memo_lock:
+                    self._memo.pop(key, None)
+                future.set_exception(e)
+            else:
+                if result[0] not in (200, 404):
+                    with self._memo_lock:
+                        self._memo.pop(key, None)
+                future.set_result(result)
+        return future.result()
+
+    def _get_json(self, url, params, retry=True, timeout=None):
+        response = self.request("GET", url, retry=retry, params=params, timeout=timeout or self.timeout)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+    def clear_cache(self, prefix: str = "") -> None:
+        """
+        Forget memoized lookups whose URL starts with prefix (all of them by default).
+        Services marked down stay marked until DOWN_SECS pass.
+        """
+        with self._memo_lock:
+            self._memo = {key: f for key, f in self._memo.items() if not f.done() or not key[0].startswith(prefix)}
+
+    # ---- Portia API ----
+    def _portia(self, path: str) -> str:
+        return f"{self.portia_url}/api/{path}"
+
+    @staticmethod
+    def _check(status: int, url: str, strict: bool) -> None:
+        # strict lookups raise on failures instead of answering [], so a cache can keep its last good value
+        if strict and status not in (200, 404):
+            raise requests.HTTPError(f"HTTP {status} from {url}")
+
+    def list_projects(self, memo: bool = True, strict: bool = False) -> list:
+        url = self._portia("projects")
+        status, data = self.get_json(url, memo=memo)
+        self._check(status, url, strict)
+        return [p["id"] for p in (data or {}).get("data", [])] if status == 200 else []
+
+    def list_spiders(self, project: str, memo: bool = True, strict: bool = False) -> list:
+        url = self._portia(f"projects/{project}/spiders")
+        status, data = self.get_json(url, memo=memo)
+        self._check(status, url, strict)
+        return [s.get("id", s) if isinstance(s, dict) else s for s in (data or {}).get("data", [])] if status == 200 else []
+
+    def get_samples(self, project: str, spider: str, memo: bool = True, context: bool = False):
+        """
+        (status_code, samples JSON) for a spider. context=True is for callers
+        that only use the samples as extra context: one try, CONTEXT_TIMEOUT.
+        """
+        url = self._portia(f"projects/{project}/spiders/{spider}/samples")
+        if context:
+            return self.get_json(url, memo=memo, retry=False, timeout=CONTEXT_TIMEOUT)
+        return self.get_json(url, memo=memo)
+
+    def list_samples(self, project: str, spider: str, memo: bool = True, strict: bool = False) -> list:
+        status, data = self.get_samples(project, spider, memo)
+        self._check(status, self._portia(f"projects/{project}/spiders/{spider}/samples"), strict)
+        return [s["id"] for s in (data or {}).get("data", [])] if status == 200 and isinstance(data, dict) else []
+
+    def create_project(self, project: str) -> requests.Response:
+        return self.request("POST", self._portia("projects"), json={"name": project})
+
+    def create_spider(self, project: str, spider: str) -> requests.Response:
+        return self.request("POST", self._portia(f"projects/{project}/spiders"), json={"name": spider})
+
+    def add_sample(self, project: str, spider: str, url: str) -> requests.Response:
+        return self.request("POST", self._portia(f"projects/{project}/spiders/{spider}/samples/"), json={"url": url})
+
+    def run_spider(self, project: str, spider: str) -> requests.Response:
+        return self.request("POST", self._portia(f"projects/{project}/spiders/{spider}/run/"))
+
+    def portia_status(self) -> int:
+        """
+        HTTP status of the Portia API root, or 0 when unreachable.
+        """
+        return self._probe_status(self._portia("projects"))
+
+    # ---- Scrapyd ----
+    def scrapyd_spiders(self, project: str, memo: bool = True, strict: bool = False) -> list:
+        url = f"{self.scrapyd_url}/listspiders.json"
+        status, data = self.get_json(url, params={"project": project}, memo=memo)
+        self._check(status, url, strict)
+        return (data or {}).get("spiders", []) if status == 200 else []
+
+    def schedule(self, project: str, spider: str, **spider_args) -> dict:
+        """
+        Schedule a Scrapyd job; returns Scrapyd's JSON answer ({"status": "ok", "jobid": ...}).
+        """
+        data = {"project": project, "spider": spider, **spider_args}
+        response = self.request("POST", f"{self.scrapyd_url}/schedule.json", data=data)
+        try:
+            return response.json()
+        except ValueError:
+            return {"status": "error", "message": f"HTTP {response.status_code}: {response.text[:200]}"}
+
+    def scrapyd_status(self) -> int:
+        """
+        HTTP status of Scrapyd's daemonstatus.json, or 0 when unreachable.
+        """
+        return self._probe_status(f"{self.scrapyd_url}/daemonstatus.json")
+
+    def _probe_status(self, url: str) -> int:
+        try:
+            return self._probe.get(url, timeout=(CONNECT_TIMEOUT, CONNECT_TIMEOUT)).status_code
+        except requests.RequestException:
+            return 0
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_portia_client() -> PortiaClient:
+    """
+    Process-wide client shared by the CLI, the batch runner and every Streamlit session.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = PortiaClient()
+        return _default_client
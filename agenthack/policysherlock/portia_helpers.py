@@ -1,9 +1,12 @@
-import requests
 import json
-import time
+from itertools import islice
+from concurrent.futures import TimeoutError as FutureTimeout
 
-# Correct Portia API base
-PORTIA_API_BASE = "http://localhost:9001/api"
+from policysherlock.portia_client import get_portia_client
+from policysherlock.scrapyd_jobs import POLL_MAX_SECS, get_job_tracker, iter_job_items, JobError
+
+JOB_TIMEOUT = 120 * POLL_MAX_SECS  # seconds to wait for the crawl: 120 polls at the slowest poll interval
+MAX_ITEMS = 20                     # scraped items returned; the rest stay in the job's feed
 
 def safe_json(r):
     try:
@@ -12,27 +15,43 @@ def safe_json(r):
         return {"status_code": r.status_code, "text": r.text}
 
 def add_sample(project_name, spider_name, url):
-    data = {"url": url}
-    r = requests.post(f"{PORTIA_API_BASE}/projects/{project_name}/spiders/{spider_name}/samples/", json=data)
-    return safe_json(r)
+    return safe_json(get_portia_client().add_sample(project_name, spider_name, url))
 
 def run_spider(project_name, spider_name):
-    r = requests.post(f"{PORTIA_API_BASE}/projects/{project_name}/spiders/{spider_name}/run/")
-    return safe_json(r)
+    return safe_json(get_portia_client().run_spider(project_name, spider_name))
 
 def get_samples(project_name, spider_name):
-    r = requests.get(f"{PORTIA_API_BASE}/projects/{project_name}/spiders/{spider_name}/samples/")
-    return safe_json(r)
+    status, data = get_portia_client().get_samples(project_name, spider_name, context=True)
+    return data if data is not None else {"status_code": status}
 
-def get_portia_data_dynamic(url, project_name="template_project", spider_name="template_spider"):
+def get_portia_data_dynamic(url, project_name="template_project", spider_name="template_spider", timeout=JOB_TIMEOUT):
     """
     Hybrid dynamic scraping:
     1. Add URL as a sample to template spider
-    2. Run spider
-    3. Fetch results
+    2. Run spider, and wait for its Scrapyd job to finish (no fixed sleep), up to timeout
+    3. Fetch results: the job's first MAX_ITEMS scraped items plus the spider's samples;
+       job["items_url"] is the whole feed (stream it with scrapyd_jobs.iter_job_items)
     """
     add_sample(project_name, spider_name, url)
-    run_spider(project_name, spider_name)
-    time.sleep(2)  # small delay for scraping
-    samples = get_samples(project_name, spider_name)
-    return samples
+    response = get_portia_client().run_spider(project_name, spider_name)
+    run = safe_json(response)
+    job_id = run.get("jobid") if isinstance(run, dict) else None
+    if not job_id and not 200 <= response.status_code < 300:
+        # Portia refused the run: schedule the spider on Scrapyd directly.
+        # A 2xx without a job id may still have started a crawl, so it is not scheduled twice.
+        run = get_portia_client().schedule(project_name, spider_name)
+        job_id = run.get("jobid")
+    result = {"url": url, "job_id": job_id, "run": run}
+    if job_id:
+        try:
+            job = get_job_tracker().track(project_name, job_id, spider_name).result(timeout=timeout)
+            result["job"] = job.to_dict()
+            items = iter_job_items(job)
+            try:
+                result["items"] = list(islice(items, MAX_ITEMS))
+            finally:
+                items.close()  # drops the feed download once enough items are read
+        except (JobError, FutureTimeout) as e:
+            result["error"] = str(e) or "Timed out waiting for the crawl"
+    result["samples"] = get_samples(project_name, spider_name)
+    return result
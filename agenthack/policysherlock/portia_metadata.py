@@ -0,0 +1,168 @@
+# policysherlock/portia_metadata.py
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from policysherlock.portia_client import get_portia_client
+
+# -----------------------
+# Config
+# -----------------------
+METADATA_TTL = 30          # seconds a lookup is served as fresh; after that it is refreshed in the background
+REFRESH_THREADS = 2        # background refreshes running at once
+
+
+class _Entry:
+    __slots__ = ("value", "error", "stored_at", "refreshing")
+
+    def __init__(self, value):
+        self.value = value
+        self.error = None
+        self.stored_at = 0.0
+        self.refreshing = False
+
+
+class MetadataCache:
+    """
+    Stale-while-revalidate cache for slow lookups. A value younger than ttl
+    is returned as is; an older one is still returned at once while a
+    background thread reloads it, so callers never wait on a refresh. Only
+    the first lookup of a key waits, and concurrent first lookups share one
+    load. A failed load keeps the previous value (or the default), records
+    the error and is retried after ttl.
+    """
+
+    def __init__(self, ttl: float = METADATA_TTL, refresh_threads: int = REFRESH_THREADS):
+        self.ttl = ttl
+        self._entries = {}  # key -> _Entry
+        self._loading = {}  # key -> Future of a first load in progress
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_threads, thread_name_prefix="portia-metadata")
+
+    def get(self, key, loader, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not entry.refreshing and time.monotonic() - entry.stored_at >= self.ttl:
+                    entry.refreshing = True
+                    self._executor.submit(self._load, key, loader, default)
+                return entry.value
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+        if owner:
+            future.set_result(self._load(key, loader, default))
+        return future.result()
+
+    def _load(self, key, loader, default):
+        try:
+            value, error = loader(), None
+        except Exception as e:
+            value, error = None, e
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(default)
+            if error is None:
+                entry.value = value
+            entry.error = error
+            entry.stored_at = time.monotonic()
+            entry.refreshing = False
+            self._loading.pop(key, None)
+            return entry.value
+
+    def error(self, key):
+        """
+        The exception from the key's last load, or None if it succeeded.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.error if entry is not None else None
+
+    def clear(self) -> None:
+        """
+        Forget every value, so the next lookups load afresh.
+        """
+        with self._lock:
+            self._entries = {}
+
+
+class PortiaMetadata:
+    """
+    The Portia/Scrapyd lookups the Streamlit app makes on every rerun
+    (service status, projects, spiders, pages), cached for all sessions.
+    Lookups against a service the last status probe found down return empty
+    at once instead of waiting on connect timeouts; the status is probed
+    again in the background once it is older than the ttl. Any write to
+    Portia through the client (a new project, spider or sample) drops the
+    cached listings, so they are read afresh.
+    """
+
+    def __init__(self, client=None, ttl: float = METADATA_TTL):
+        self.client = client or get_portia_client()
+        self.cache = MetadataCache(ttl)
+        self._writes_seen = self.client.portia_writes
+
+    def _listing(self, key: tuple, loader):
+        writes = self.client.portia_writes
+        if writes != self._writes_seen:
+            self._writes_seen = writes
+            self.cache.clear()
+        return self.cache.get(key, loader, [])
+
+    def status(self) -> tuple:
+        """
+        (Portia HTTP status, Scrapyd HTTP status); 0 means unreachable.
+        """
+        return self.cache.get(("status",), lambda: (self.client.portia_status(), self.client.scrapyd_status()), (0, 0))
+
+    def portia_up(self) -> bool:
+        return self.status()[0] == 200
+
+    def scrapyd_up(self) -> bool:
+        return self.status()[1] == 200
+
+    def projects(self) -> list:
+        if not self.portia_up():
+            return []
+        return self._listing(("projects",), lambda: self.client.list_projects(memo=False, strict=True))
+
+    def spiders(self, project: str) -> list:
+        if not self.portia_up():
+            return []
+        return self._listing(("spiders", project), lambda: self.client.list_spiders(project, memo=False, strict=True))
+
+    def pages(self, project: str, spider: str) -> list:
+        if not self.portia_up():
+            return []
+        return self._listing(("pages", project, spider),
+                             lambda: self.client.list_samples(project, spider, memo=False, strict=True))
+
+    def scrapyd_spiders(self, project: str) -> list:
+        if not self.scrapyd_up():
+            return []
+        return self._listing(("scrapyd_spiders", project),
+                             lambda: self.client.scrapyd_spiders(project, memo=False, strict=True))
+
+    def error(self, *key):
+        return self.cache.error(key)
+
+    def refresh(self) -> None:
+        self.cache.clear()
+
+
+_default_metadata = None
+_default_lock = threading.Lock()
+
+
+def get_portia_metadata() -> PortiaMetadata:
+    """
+    Process-wide metadata cache, shared by every Streamlit session.
+    """
+    global _default_metadata
+    with _default_lock:
+        if _default_metadata is None:
+            _default_metadata = PortiaMetadata()
+        return _default_metadata
@@ -0,0 +1,194 @@
+# policysherlock/rule_engine.py
+
+import os
+import re
+import json
+import threading
+from collections import deque
+
+RULE_PACK_PATH = os.environ.get(
+    "POLICYSHERLOCK_RULE_PACK",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "privacy_rules.json"),
+)
+SEVERITIES = ("Low", "Medium", "High")
+WORD_RE = re.compile(r"\w+")
+# Named groups, backreferences (\1, \g<1>, (?P=name)) and conditionals ((?(1)...)) mean
+# something else once patterns are joined, so such patterns are compiled on their own
+GROUP_REF_RE = re.compile(r"\(\?P<|\(\?P=|\(\?\(|(?<!\\)(?:\\\\)*\\(?:[1-9]|g<)")
+
+
+class Rule:
+    __slots__ = ("id", "severity", "message", "regulations")
+
+    def __init__(self, id, severity, message, regulations=()):
+        self.id = id
+        self.severity = severity
+        self.message = message
+        self.regulations = tuple(regulations)
+
+
+class Hit:
+    """
+    One rule match: the rule and the (start, end) character range it matched.
+    """
+    __slots__ = ("rule", "start", "end", "text")
+
+    def __init__(self, rule, start, end, text):
+        self.rule = rule
+        self.start = start
+        self.end = end
+        self.text = text
+
+    @property
+    def severity(self):
+        return self.rule.severity
+
+    def to_dict(self) -> dict:
+        return {"rule": self.rule.id, "severity": self.rule.severity, "start": self.start,
+                "end": self.end, "text": self.text}
+
+    def __repr__(self):
+        return f"Hit({self.rule.id!r}, {self.start}, {self.end})"
+
+
+class _WordAutomaton:
+    """
+    Aho-Corasick automaton over lower-cased words rather than characters:
+    phrases match on whole-word boundaries, and each text token costs one
+    dict lookup (plus failure transitions) however many phrases there are.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]   # state -> ((rule_index, phrase_word_count), ...)
+        self.max_words = 0
+
+    def add(self, words, payload):
+        state = 0
+        for word in words:
+            nxt = self.goto[state].get(word)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][word] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = nxt
+        if payload not in self.out[state]:
+            self.out[state] += (payload,)
+        self.max_words = max(self.max_words, len(words))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and word not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(word, 0)
+                # A state also reports every phrase that ends in its suffix
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def scan(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        starts = deque(maxlen=max(1, self.max_words))
+        state = 0
+        for m in WORD_RE.finditer(text):
+            word = m.group().lower()
+            starts.append(m.start())
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if out[state]:
+                end = m.end()
+                for rule_index, words in out[state]:
+                    yield rule_index, starts[-words], end
+
+
+class RulePack:
+    """
+    A declarative rule pack compiled once into two single-pass matchers:
+    a word-level Aho-Corasick automaton for all literal phrases and one
+    combined alternation for the (fewer) regex patterns. Patterns that use
+    their own named groups or group references are matched separately.
+    """
+
+    def __init__(self, rules: list, name: str = "rules"):
+        self.name = name
+        self.rules = []
+        self._automaton = _WordAutomaton()
+        patterns = []
+        self._group_rules = {}      # group number of each pattern in the combined regex -> rule index
+        self._separate = []         # (compiled pattern, rule index) for patterns that cannot be combined
+        group = 1
+        for index, spec in enumerate(rules):
+            severity = spec.get("severity", "Low")
+            if severity not in SEVERITIES:
+                raise ValueError(f"Rule {spec.get('id')!r}: severity must be one of {SEVERITIES}")
+            if not spec.get("phrases") and not spec.get("patterns"):
+                raise ValueError(f"Rule {spec.get('id')!r} has no phrases or patterns")
+            self.rules.append(Rule(spec.get("id", str(index)), severity,
+                                   spec.get("message", spec.get("id", "")), spec.get("regulations", ())))
+            for phrase in spec.get("phrases", ()):
+                words = WORD_RE.findall(phrase.lower())
+                if words:
+                    self._automaton.add(words, (index, len(words)))
+            for pattern in spec.get("patterns", ()):
+                compiled = re.compile(pattern, re.IGNORECASE)  # a broken pattern is reported against its own rule
+                if compiled.groupindex or GROUP_REF_RE.search(pattern):
+                    self._separate.append((compiled, index))
+                    continue
+                patterns.append(f"({pattern})")
+                self._group_rules[group] = index
+                group += 1 + compiled.groups
+        self._automaton.build()
+        self._pattern_re = re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def scan(self, text: str) -> list:
+        """
+        Every hit in text, ordered by offset. Phrases may overlap each other;
+        each regex pattern reports non-overlapping matches.
+        """
+        hits = [Hit(self.rules[i], start, end, text[start:end])
+                for i, start, end in self._automaton.scan(text)]
+        if self._pattern_re is not None:
+            for m in self._pattern_re.finditer(text):
+                # A pattern's own groups close before the group wrapping it, so lastindex is the wrapper
+                rule = self.rules[self._group_rules[m.lastindex]]
+                hits.append(Hit(rule, m.start(), m.end(), m.group()))
+        for compiled, index in self._separate:
+            for m in compiled.finditer(text):
+                hits.append(Hit(self.rules[index], m.start(), m.end(), m.group()))
+        hits.sort(key=lambda hit: (hit.start, hit.end))
+        return hits
+
+
+def load_rule_pack(path: str = RULE_PACK_PATH) -> RulePack:
+    """
+    Compile a JSON rule pack: {"name": ..., "rules": [{"id", "severity",
+    "message", "phrases": [...], "patterns": [...], "regulations": [...]}]}.
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    return RulePack(spec["rules"], name=spec.get("name", os.path.basename(path)))
+
+
+_default_pack = None
+_default_lock = threading.Lock()
+
+
+def get_rule_pack() -> RulePack:
+    """
+    The default pack, compiled on first use and shared by every caller.
+    """
+    global _default_pack
+    with _default_lock:
+        if _default_pack is None:
+            _default_pack = load_rule_pack()
+        return _default_pack
@@ -0,0 +1,124 @@
+# policysherlock/scrapyd_batch.py
+
+import os
+import time
+from urllib.parse import urlsplit
+
+from policysherlock.portia_client import get_portia_client
+from policysherlock.scrapyd_jobs import get_job_tracker, JobError
+from policysherlock.feed_ingest import SCRAPYD_ITEMS_DIR, FOLLOW_POLL_SECS, job_feed_source, iter_feed_items, item_url
+from policysherlock.discovery import normalize_url
+
+# -----------------------
+# Config
+# -----------------------
+URLS_PER_JOB = 500          # start URLs packed into one Scrapyd job (one Scrapy process)
+START_URLS_ARG = "start_urls"  # spider argument carrying the URLs, comma-separated
+# Item fields where a spider may record the URL it requested (before any redirect)
+REQUEST_URL_FIELDS = ("start_url", "request_url", "_request_url", "original_url", "redirect_urls")
+
+
+def start_urls_arg(urls: list) -> str:
+    # Commas separate URLs, so escape any inside one
+    return ",".join(url.replace(",", "%2C") for url in urls)
+
+
+def url_key(url: str) -> str:
+    """
+    Matching key for a URL: normalized, without "www." and a trailing slash,
+    so the item a spider emits for a start URL is found again.
+    """
+    parts = urlsplit(normalize_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return f"{host}{parts.path.rstrip('/')}{'?' + parts.query if parts.query else ''}"
+
+
+def _item_urls(item: dict):
+    url = item_url(item)
+    if url:
+        yield url
+    for field in REQUEST_URL_FIELDS:
+        value = item.get(field)
+        for candidate in (value if isinstance(value, list) else [value]):
+            if isinstance(candidate, str) and candidate.strip():
+                yield candidate.strip()
+
+
+class UrlBatch:
+    """
+    One Scrapyd job crawling many start URLs, and which of them are still
+    waiting for an item. future resolves when the job finishes.
+    """
+
+    def __init__(self, project: str, spider: str, urls: list, job_id: str, future):
+        self.project = project
+        self.spider = spider
+        self.urls = list(dict.fromkeys(urls))
+        self.job_id = job_id
+        self.future = future
+        self._pending = {}   # url_key -> original URLs with that key (www.a.com/x and a.com/x share one)
+        for url in self.urls:
+            self._pending.setdefault(url_key(url), []).append(url)
+
+    def match(self, item: dict) -> list:
+        """
+        The pending start URLs an item answers, marking them done; [] for
+        items of pages the spider followed on its own. The item's URL is
+        matched first, then any URL it records in REQUEST_URL_FIELDS, so a
+        redirected start URL is only matched when the spider kept the URL
+        it was asked for.
+        """
+        for url in _item_urls(item):
+            urls = self._pending.pop(url_key(url), None)
+            if urls:
+                return urls
+        return []
+
+    def remaining(self) -> list:
+        return [url for urls in self._pending.values() for url in urls]
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+
+def schedule_url_batch(urls: list, project: str, spider: str, client=None, tracker=None, **spider_args) -> UrlBatch:
+    """
+    Schedule one Scrapyd job that crawls all urls and start tracking it.
+    Raises JobError when Scrapyd refuses the job.
+    """
+    client = client or get_portia_client()
+    tracker = tracker or get_job_tracker()
+    answer = client.schedule(project, spider, **{START_URLS_ARG: start_urls_arg(urls)}, **spider_args)
+    if answer.get("status") != "ok" or not answer.get("jobid"):
+        raise JobError(f"Scrapyd did not schedule {spider}: {answer.get('message', answer)}")
+    future = tracker.track(project, answer["jobid"], spider)
+    return UrlBatch(project, spider, urls, answer["jobid"], future)
+
+
+def iter_batch_items(batch: UrlBatch, timeout: float = None):
+    """
+    Yield (start_url, item) as each start URL's first item arrives, then
+    (start_url, None) for every URL the job finished without an item.
+    Input URLs that normalize to the same page all get that page's item.
+    With Scrapyd's items_dir on this machine the feed is tailed while the
+    job runs, so items are handed on as they are scraped; otherwise it is
+    streamed from Scrapyd once the job finishes. Items for pages the spider
+    followed on its own (not start URLs) are skipped.
+    """
+    running = lambda: not batch.future.done()
+    source, follow = "", None
+    if SCRAPYD_ITEMS_DIR:
+        source = os.path.join(SCRAPYD_ITEMS_DIR, batch.project, batch.spider, f"{batch.job_id}.jl")
+        follow = running
+        while running() and not os.path.exists(source):
+            time.sleep(FOLLOW_POLL_SECS)  # the feed file appears with the first item
+    if not (source and os.path.exists(source)):
+        source, follow = job_feed_source(batch.future.result(timeout=timeout)), None
+    if source:
+        for item in iter_feed_items(source, follow):
+            for start_url in batch.match(item):
+                yield start_url, item
+            if not batch.pending_count():
+                break
+    for url in batch.remaining():
+        yield url, None
@@ -0,0 +1,221 @@
+# policysherlock/scrapyd_jobs.py
+
+import json
+import threading
+from concurrent.futures import Future, InvalidStateError
+from urllib.parse import urljoin
+
+import requests
+
+from policysherlock.portia_client import get_portia_client
+
+# -----------------------
+# Config
+# -----------------------
+POLL_MIN_SECS = 0.25       # poll interval right after a job is added or changes state
+POLL_MAX_SECS = 5.0        # ceiling while nothing changes (long crawls)
+POLL_BACKOFF = 1.5         # interval multiplier per poll without a state change
+MISSING_POLLS = 20         # polls a job may be absent from listjobs.json before it is reported lost
+MAX_POLL_ERRORS = 20       # consecutive failed listjobs.json calls before a project's jobs fail
+JOB_STATES = ("pending", "running", "finished")
+
+
+class JobError(Exception):
+    pass
+
+
+class ScrapydJob:
+    """
+    One tracked Scrapyd job. state follows listjobs.json: pending, running, finished.
+    """
+    __slots__ = ("project", "job_id", "spider", "state", "start_time", "end_time", "items_url", "log_url",
+                 "future", "_missing")
+
+    def __init__(self, project, job_id, spider=""):
+        self.project = project
+        self.job_id = job_id
+        self.spider = spider
+        self.state = "pending"
+        self.start_time = None
+        self.end_time = None
+        self.items_url = None
+        self.log_url = None
+        self.future = Future()
+        self._missing = 0
+
+    def to_dict(self) -> dict:
+        return {"project": self.project, "job_id": self.job_id, "spider": self.spider, "state": self.state,
+                "start_time": self.start_time, "end_time": self.end_time, "items_url": self.items_url,
+                "log_url": self.log_url}
+
+    def __repr__(self):
+        return f"ScrapydJob({self.project!r}, {self.job_id!r}, {self.state!r})"
+
+
+class JobTracker:
+    """
+    Waits on any number of Scrapyd jobs with one poller thread.
+    Each round makes one listjobs.json call per project, whatever the number of
+    jobs. The interval starts at POLL_MIN_SECS and grows by POLL_BACKOFF while
+    nothing changes, up to POLL_MAX_SECS; a state change or a new job resets
+    it, so short crawls are noticed within a fraction of a second and long
+    ones cost a request every few seconds. The thread exits when no jobs are left.
+    """
+
+    def __init__(self, client=None, min_interval: float = POLL_MIN_SECS, max_interval: float = POLL_MAX_SECS):
+        self.client = client or get_portia_client()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.polls = 0
+        self._jobs = {}  # (project, job_id) -> ScrapydJob
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def track(self, project: str, job_id: str, spider: str = "", callback=None) -> Future:
+        """
+        Start tracking a job. Returns a Future resolving to the finished
+        ScrapydJob (or failing with JobError); callback(job), if given, runs
+        on the poller thread when it finishes.
+        """
+        with self._lock:
+            job = self._jobs.get((project, job_id))
+            if job is None:
+                job = self._jobs[(project, job_id)] = ScrapydJob(project, job_id, spider)
+            if callback is not None:
+                job.future.add_done_callback(_on_success(callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="scrapyd-jobs", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return job.future
+
+    def outstanding(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def _run(self):
+        interval, errors = self.min_interval, {}
+        while True:
+            with self._lock:
+                if not self._jobs:
+                    self._thread = None
+                    return
+                by_project = {}
+                for job in self._jobs.values():
+                    by_project.setdefault(job.project, []).append(job)
+            changed = False
+            for project, jobs in by_project.items():
+                try:
+                    changed |= self._poll(project, jobs, errors)
+                except Exception as e:
+                    # Anything unexpected fails this project's jobs instead of killing the
+                    # poller, which would leave every current and future Future hanging
+                    for job in jobs:
+                        self._resolve(job, JobError(f"Could not track job {job.job_id}: {e!r}"))
+                    changed = True
+            self.polls += 1
+            interval = self.min_interval if changed else min(interval * POLL_BACKOFF, self.max_interval)
+            if self._wake.wait(interval):
+                self._wake.clear()
+                interval = self.min_interval
+
+    def _poll(self, project: str, jobs: list, errors: dict) -> bool:
+        # One listjobs.json call for a project's jobs; True if any changed state
+        try:
+            status, data = self.client.get_json(
+                f"{self.client.scrapyd_url}/listjobs.json", params={"project": project}, memo=False
+            )
+            if status != 200 or not isinstance(data, dict):
+                raise JobError(f"listjobs.json returned HTTP {status}")
+        except (requests.RequestException, JobError) as e:
+            errors[project] = errors.get(project, 0) + 1
+            if errors[project] >= MAX_POLL_ERRORS:
+                for job in jobs:
+                    self._resolve(job, JobError(f"Scrapyd unreachable for project {project}: {e}"))
+                return True
+            return False
+        errors.pop(project, None)
+        return self._update(jobs, data)
+
+    def _update(self, jobs: list, listing: dict) -> bool:
+        index = {}
+        for state in JOB_STATES:
+            for entry in listing.get(state) or ():
+                index[entry.get("id")] = (state, entry)
+        changed = False
+        for job in jobs:
+            found = index.get(job.job_id)
+            if found is None:
+                job._missing += 1
+                if job._missing >= MISSING_POLLS:
+                    self._resolve(job, JobError(f"Job {job.job_id} is not known to Scrapyd"))
+                    changed = True
+                continue
+            state, entry = found
+            job._missing = 0
+            job.spider = entry.get("spider") or job.spider
+            job.start_time = entry.get("start_time") or job.start_time
+            if state != job.state:
+                job.state = state
+                changed = True
+            if state == "finished":
+                job.end_time = entry.get("end_time")
+                base = self.client.scrapyd_url + "/"
+                job.items_url = urljoin(base, entry.get("items_url") or f"items/{job.project}/{job.spider}/{job.job_id}.jl")
+                job.log_url = urljoin(base, entry["log_url"]) if entry.get("log_url") else None
+                self._resolve(job)
+        return changed
+
+    def _resolve(self, job, error=None):
+        with self._lock:
+            self._jobs.pop((job.project, job.job_id), None)
+        try:
+            if error is None:
+                job.future.set_result(job)
+            else:
+                job.future.set_exception(error)
+        except InvalidStateError:
+            pass  # cancelled by the caller
+
+
+def _on_success(callback):
+    def done(future):
+        if future.exception() is None:
+            callback(future.result())
+    return done
+
+
+def iter_job_items(job: ScrapydJob, client=None):
+    """
+    Yield the finished job's scraped items one at a time from Scrapyd's JSON
+    Lines feed, without holding the feed in memory. Yields nothing when the
+    feed is missing (Scrapyd without items_dir) or the job produced no items.
+    """
+    client = client or get_portia_client()
+    if not job.items_url:
+        return
+    with client.session.get(job.items_url, stream=True, timeout=client.timeout) as response:
+        if response.status_code != 200:
+            return
+        for line in response.iter_lines():
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crashed crawl
+
+
+_default_tracker = None
+_default_lock = threading.Lock()
+
+
+def get_job_tracker() -> JobTracker:
+    """
+    Process-wide tracker, so every audit thread and Streamlit session shares one poller.
+    """
+    global _default_tracker
+    with _default_lock:
+        if _default_tracker is None:
+            _default_tracker = JobTracker()
+        return _default_tracker
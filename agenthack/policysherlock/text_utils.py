@@ -1,43 +1,308 @@
 # policysherlock/text_utils.py
 
+import re
+import math
+import heapq
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
 from io import BytesIO
-from docx import Document
-import PyPDF2
+from collections import Counter, OrderedDict
+
+from policysherlock.document_cache import get_document_cache
+from policysherlock.pdf_extract import iter_pdf_pages
+from policysherlock.docx_extract import iter_docx_text
+
+TOKEN_RE = re.compile(r"\w+")
+PARAGRAPH_RE = re.compile(r"\n[ \t]*\n\s*")
+SENTENCE_RE = re.compile(r"[.!?;:][\"')\]]*\s+|\n")
+BOUNDARY_CHARS = frozenset(".!?;:\"')]")  # with whitespace, every character a boundary match can contain
+CHARS_PER_TOKEN = 4  # rough budget for English policy text
+MAX_CACHED_INDEXES = 32
+
+class ExtractedDocument:
+    """
+    Text extracted from an upload, with its page map and chunk offsets.
+    key is the content hash, usable as the BM25 doc_key.
+    """
+
+    def __init__(self, key, text, pages, chunks):
+        self.key = key
+        self.text = text
+        self.pages = pages    # [(page_no, start_offset)], ascending
+        self.chunks = chunks  # [(start, end)]
+
+    @property
+    def spans(self):
+        return [TextSpan(self.text, start, end) for start, end in self.chunks]
+
+    def page_of(self, offset):
+        """
+        Page number containing a character offset.
+        """
+        i = bisect_right([start for _, start in self.pages], offset)
+        return self.pages[i - 1][0] if i else 1
+
+def _iter_pages(data, mime):
+    # Yields (page_no, text); DOCX and text files count as a single page
+    if mime == "application/pdf":
+        yield from iter_pdf_pages(data)
+    elif mime == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        yield 1, "\n".join(iter_docx_text(data))
+    elif mime.startswith("text"):
+        yield 1, data.decode("utf-8")
+
+def load_document(uploaded_file):
+    """
+    Extract an uploaded PDF, DOCX, or TXT file into an ExtractedDocument.
+    Results are cached by content hash in memory and on disk, so Streamlit reruns,
+    other tabs and other sessions skip extraction for a file already seen.
+    """
+    data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+    mime = uploaded_file.type or ""
+    key = hashlib.sha256(mime.encode() + b"\x00" + data).hexdigest()
+
+    cache = get_document_cache()
+    entry = cache.get(key)
+    if entry is None:
+        # Chunk pages as they stream out of the extractor instead of after the last one
+        chunker = StreamingChunker()
+        parts, pages, offset = [], [], 0
+        for page_no, page_text in _iter_pages(data, mime):
+            if parts:
+                parts.append("\n")
+                chunker.feed("\n")
+                offset += 1
+            pages.append([page_no, offset])
+            parts.append(page_text)
+            chunker.feed(page_text)
+            offset += len(page_text)
+        chunker.close()
+        entry = {"text": "".join(parts), "pages": pages, "chunks": [list(c) for c in chunker.chunks]}
+        cache.put(key, entry)
+    return ExtractedDocument(key, entry["text"], [tuple(p) for p in entry["pages"]], [tuple(c) for c in entry["chunks"]])
 
 def load_text_from_upload(uploaded_file):
     """
     Load text from uploaded PDF, DOCX, or TXT file.
     """
-    if uploaded_file.type == "application/pdf":
-        reader = PyPDF2.PdfReader(uploaded_file)
-        text = "\n".join([page.extract_text() or "" for page in reader.pages])
-        return text
-    elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        doc = Document(uploaded_file)
-        text = "\n".join([p.text for p in doc.paragraphs])
-        return text
-    elif uploaded_file.type.startswith("text"):
-        return uploaded_file.read().decode("utf-8")
-    else:
-        return ""
-
-def chunk_text(text, chunk_size=1000):
+    return load_document(uploaded_file).text
+
+class TextSpan:
+    """
+    A (start, end) character range of a source text.
+    The chunk text is only sliced out when asked for.
+    """
+    __slots__ = ("source", "start", "end")
+
+    def __init__(self, source, start, end):
+        self.source = source
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self):
+        return self.source[self.start:self.end]
+
+    def __str__(self):
+        return self.text
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"TextSpan({self.start}, {self.end})"
+
+def _last_in(positions, lo, hi):
+    # Largest boundary p with lo < p <= hi
+    i = bisect_right(positions, hi)
+    return positions[i - 1] if i and positions[i - 1] > lo else None
+
+def _first_in(positions, lo, hi):
+    # Smallest boundary p with lo <= p < hi
+    i = bisect_left(positions, lo)
+    return positions[i] if i < len(positions) and positions[i] < hi else None
+
+def chunk_spans(text, max_chars=1000, overlap=150, max_tokens=None, start=0):
+    """
+    Split text into overlapping TextSpan chunks of at most max_chars
+    (or max_tokens * CHARS_PER_TOKEN when a token budget is given).
+    Chunks end on a paragraph break where possible, then a sentence end, then a
+    space; each chunk after the first starts on a sentence boundary inside the
+    previous chunk's last `overlap` characters. Chunking begins at start.
+    """
+    if max_tokens:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+    min_chars = max_chars // 2
+    overlap = min(overlap, min_chars)
+    paragraphs = [m.end() for m in PARAGRAPH_RE.finditer(text)]
+    sentences = [m.end() for m in SENTENCE_RE.finditer(text)]
+
+    spans, pos, n = [], start, len(text)
+    while pos < n:
+        limit = pos + max_chars
+        if limit >= n:
+            cut = n
+        else:
+            space = text.rfind(" ", pos + min_chars, limit)
+            cut = (_last_in(paragraphs, pos + min_chars, limit)
+                   or _last_in(sentences, pos + min_chars, limit)
+                   or (space + 1 if space != -1 else limit))
+        spans.append(TextSpan(text, pos, cut))
+        if cut >= n:
+            break
+        next_pos = _first_in(sentences, cut - overlap, cut) if overlap else None
+        pos = next_pos if next_pos and next_pos > pos else cut
+    return spans
+
+def _in_boundary(ch):
+    return ch.isspace() or ch in BOUNDARY_CHARS
+
+class StreamingChunker:
+    """
+    chunk_spans() over text that arrives piece by piece, with the same output.
+    A chunk is emitted as (start, end) offsets once everything chunk_spans()
+    looks at for it lies before the buffer's trailing run of whitespace and
+    punctuation, the only text a later piece can turn into (or extend) a
+    boundary match. The buffer is then cut just before the next chunk, at a
+    character no boundary match can contain, so re-scanning it finds the
+    same boundaries as scanning the whole text.
+    """
+
+    def __init__(self, max_chars=1000, overlap=150, max_tokens=None):
+        self.max_chars = max_tokens * CHARS_PER_TOKEN if max_tokens else max_chars
+        self.overlap = overlap
+        self.chunks = []
+        self._buffer = ""
+        self._base = 0   # offset of _buffer[0] in the full text
+        self._start = 0  # where chunking resumes, in _buffer
+
+    def feed(self, piece):
+        """
+        Add text; returns the chunks that became final.
+        """
+        self._buffer += piece
+        stable = len(self._buffer)
+        while stable > self._start and _in_boundary(self._buffer[stable - 1]):
+            stable -= 1
+        if stable - self._start < 2 * self.max_chars:
+            return []  # too little settled text to be worth re-scanning yet
+        spans = chunk_spans(self._buffer, self.max_chars, self.overlap, start=self._start)
+        settled = []
+        for span in spans:
+            if span.start + self.max_chars >= stable:
+                break
+            settled.append((self._base + span.start, self._base + span.end))
+        if settled:
+            # The first unsettled span starts where chunking must resume
+            resume = spans[len(settled)].start
+            cut = resume
+            while cut > 0 and _in_boundary(self._buffer[cut - 1]):
+                cut -= 1
+            self._buffer = self._buffer[cut:]
+            self._base += cut
+            self._start = resume - cut
+            self.chunks.extend(settled)
+        return settled
+
+    def close(self):
+        """
+        Flush the tail; returns the final chunks.
+        """
+        tail = [(self._base + span.start, self._base + span.end)
+                for span in chunk_spans(self._buffer, self.max_chars, self.overlap, start=self._start)]
+        self._buffer, self._start = "", 0
+        self.chunks.extend(tail)
+        return tail
+
+def chunk_text(text, chunk_size=1000, overlap=0):
     """
     Split text into chunks for lightweight RAG.
+    Returns plain strings; use chunk_spans() to keep offsets instead.
+    """
+    return [span.text for span in chunk_spans(text, chunk_size, overlap)]
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    """
+    Inverted index over a document's chunks with BM25 scoring.
+    Per-posting weights are precomputed, so a query is a sum over its terms' postings.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        term_counts = [Counter(tokenize(str(chunk))) for chunk in chunks]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_len = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+        doc_freq = Counter()
+        for counts in term_counts:
+            doc_freq.update(counts.keys())
+        n = len(chunks)
+
+        self.postings = {}
+        for i, counts in enumerate(term_counts):
+            norm = k1 * (1 - b + b * lengths[i] / avg_len) if avg_len else k1
+            for term, tf in counts.items():
+                df = doc_freq[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                self.postings.setdefault(term, []).append((i, idf * tf * (k1 + 1) / (tf + norm)))
+
+    def top_k(self, query, k=3):
+        """
+        Return [(score, chunk_index)] for the k best-scoring chunks, best first.
+        """
+        scores = {}
+        for term in set(tokenize(query)):
+            for i, weight in self.postings.get(term, ()):
+                scores[i] = scores.get(i, 0.0) + weight
+        return heapq.nlargest(k, ((score, i) for i, score in scores.items()))
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()  # Streamlit sessions and batch workers share the cache
+
+def get_index(chunks, doc_key=None):
+    """
+    BM25 index for these chunks, cached by document hash across questions.
     """
-    chunks = []
-    for i in range(0, len(text), chunk_size):
-        chunks.append(text[i:i+chunk_size])
-    return chunks
+    if doc_key is None:
+        digest = hashlib.sha1()
+        if chunks and isinstance(chunks[0], TextSpan):
+            # Hash the source once plus the offsets instead of every slice
+            digest.update(chunks[0].source.encode("utf-8", "surrogatepass"))
+            digest.update(repr([(c.start, c.end) for c in chunks]).encode())
+        else:
+            for chunk in chunks:
+                digest.update(str(chunk).encode("utf-8", "surrogatepass"))
+                digest.update(b"\x00")
+        doc_key = digest.hexdigest()
+    with _index_lock:
+        index = _index_cache.get(doc_key)
+        if index is not None:
+            _index_cache.move_to_end(doc_key)
+            return index
+    # Built outside the lock so other documents are not held up; if two threads
+    # build the same one, the first stored is kept
+    index = BM25Index(chunks)
+    with _index_lock:
+        index = _index_cache.setdefault(doc_key, index)
+        _index_cache.move_to_end(doc_key)
+        while len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    return index
 
-def keyword_rank(chunks, query):
+def keyword_rank(chunks, query, top_k=None, doc_key=None):
     """
-    Rank chunks based on query relevance (simple keyword match).
+    Rank chunks by BM25 relevance to the query.
+    With top_k, returns only that many chunks (padded with unmatched chunks in
+    document order if fewer match); otherwise every chunk, best first.
     """
-    query_words = query.lower().split()
-    ranked = []
-    for chunk in chunks:
-        score = sum(chunk.lower().count(w) for w in query_words)
-        ranked.append((score, chunk))
-    ranked.sort(reverse=True, key=lambda x: x[0])
-    return [chunk for score, chunk in ranked]
+    index = get_index(chunks, doc_key)
+    k = len(chunks) if top_k is None else top_k
+    hits = [i for _, i in index.top_k(query, k)]
+    if len(hits) < k:
+        seen = set(hits)
+        hits += [i for i in range(len(chunks)) if i not in seen][:k - len(hits)]
+    return [chunks[i] for i in hits]
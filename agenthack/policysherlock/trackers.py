@@ -0,0 +1,211 @@
+# policysherlock/trackers.py
+
+import os
+import re
+import json
+import hashlib
+import threading
+
+TRACKER_DB_PATH = os.environ.get(
+    "POLICYSHERLOCK_TRACKER_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "tracker_signatures.json"),
+)
+IDENT_RE = re.compile(r"[A-Za-z_$][\w$]*")
+
+
+class Tracker:
+    __slots__ = ("id", "name", "owner", "category")
+
+    def __init__(self, id, name, owner="", category=""):
+        self.id = id
+        self.name = name
+        self.owner = owner
+        self.category = category
+
+    def __repr__(self):
+        return f"Tracker({self.id!r})"
+
+
+class TrackerHit:
+    """
+    One classified resource: which tracker, the kind of element it came from,
+    the URL (or matched snippet for inline code) and the signature that matched.
+    """
+    __slots__ = ("tracker", "kind", "resource", "signature")
+
+    def __init__(self, tracker, kind, resource, signature):
+        self.tracker = tracker
+        self.kind = kind
+        self.resource = resource
+        self.signature = signature
+
+    def to_dict(self) -> dict:
+        return {"tracker": self.tracker.id, "name": self.tracker.name, "category": self.tracker.category,
+                "kind": self.kind, "resource": self.resource, "signature": self.signature}
+
+    def __repr__(self):
+        return f"TrackerHit({self.tracker.id!r}, {self.kind!r}, {self.resource!r})"
+
+
+def split_host(url: str):
+    """
+    (host, path) of an absolute or protocol-relative URL; ("", "") for relative
+    ones, which are first-party by definition.
+    """
+    start = url.find("//")
+    if start < 0 or (start > 0 and url[start - 1] != ":"):
+        return "", ""
+    rest = url[start + 2:]
+    end = len(rest)
+    for sep in "/?#":
+        i = rest.find(sep)
+        if 0 <= i < end:
+            end = i
+    host = rest[:end].rsplit("@", 1)[-1].split(":", 1)[0].lower().rstrip(".")
+    path = rest[end:] if end < len(rest) and rest[end] == "/" else "/"
+    return host, path
+
+
+class TrackerDB:
+    """
+    Signature index. Host signatures live in a hash keyed by domain suffix, so
+    a lookup walks the host's labels from most to least specific
+    (a.b.example.com, b.example.com, example.com, com): one dict probe per
+    label whatever the database size. Path signatures hang off the same
+    suffixes, and inline snippets are keyed by their first identifier so each
+    script costs one probe per distinct identifier it contains.
+    """
+
+    def __init__(self, trackers: list, name: str = "trackers"):
+        self.name = name
+        self.trackers = {}
+        self._hosts = {}     # "doubleclick.net" -> Tracker
+        self._paths = {}     # "facebook.com" -> [("/tr", Tracker)], longest prefix first
+        self._snippets = {}  # "fbq" -> [("fbq('init'", Tracker)]
+        self.signatures = 0
+        for spec in trackers:
+            tracker = Tracker(spec["id"], spec.get("name", spec["id"]), spec.get("owner", ""), spec.get("category", ""))
+            self.trackers[tracker.id] = tracker
+            for host in spec.get("hosts", ()):
+                self._hosts.setdefault(host.lower().strip("."), tracker)
+                self.signatures += 1
+            for entry in spec.get("paths", ()):
+                host, _, path = entry.partition("/")
+                self._paths.setdefault(host.lower(), []).append(("/" + path, tracker))
+                self.signatures += 1
+            for snippet in spec.get("snippets", ()):
+                ident = IDENT_RE.search(snippet)
+                if ident is None:
+                    raise ValueError(f"Tracker {tracker.id}: snippet {snippet!r} has no identifier")
+                self._snippets.setdefault(ident.group(0), []).append((snippet, tracker))
+                self.signatures += 1
+        for prefixes in self._paths.values():
+            prefixes.sort(key=lambda p: -len(p[0]))
+        self.digest = hashlib.sha256(
+            json.dumps(trackers, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def __len__(self):
+        return self.signatures
+
+    def match_host(self, host: str, path: str = "/"):
+        """
+        (Tracker, signature) for a host and path, or (None, None).
+        """
+        suffix = host
+        while suffix:
+            prefixes = self._paths.get(suffix)
+            if prefixes:
+                for prefix, tracker in prefixes:
+                    if path.startswith(prefix):
+                        return tracker, suffix + prefix
+            tracker = self._hosts.get(suffix)
+            if tracker is not None:
+                return tracker, suffix
+            dot = suffix.find(".")
+            if dot < 0:
+                break
+            suffix = suffix[dot + 1:]
+        return None, None
+
+    def match_url(self, url: str):
+        host, path = split_host(url.strip())
+        if not host:
+            return None, None
+        return self.match_host(host, path)
+
+    def match_inline(self, code: str) -> list:
+        """
+        [(Tracker, snippet)] for every snippet signature found in inline script code.
+        """
+        found = []
+        for ident in set(IDENT_RE.findall(code)):
+            for snippet, tracker in self._snippets.get(ident, ()):
+                if snippet in code:
+                    found.append((tracker, snippet))
+        return found
+
+    def classify(self, features: dict, page_url: str = "") -> list:
+        """
+        Every tracker hit among the scripts, images, iframes, <link>s and inline
+        scripts of extract_features() output, in one pass. Resources on the
+        page's own site are first-party and never counted.
+        """
+        page_host = split_host(page_url)[0]
+        first_party = page_host[4:] if page_host.startswith("www.") else page_host
+        hits, seen = [], set()
+        # Pixels come before images so a 1x1 image is reported once, as a pixel
+        for kind, urls in (("script", features.get("script_srcs", ())), ("pixel", features.get("pixels", ())),
+                           ("img", features.get("img_srcs", ())), ("iframe", features.get("iframes", ())),
+                           ("link", features.get("link_hrefs", ()))):
+            for url in urls:
+                if url in seen:
+                    continue
+                seen.add(url)
+                host, path = split_host(url.strip())
+                if not host or (first_party and (host == first_party or host.endswith("." + first_party))):
+                    continue
+                tracker, signature = self.match_host(host, path)
+                if tracker is not None:
+                    hits.append(TrackerHit(tracker, kind, url, signature))
+        for code in features.get("inline_scripts", ()):
+            for tracker, snippet in self.match_inline(code):
+                if ("inline", tracker.id) not in seen:
+                    seen.add(("inline", tracker.id))
+                    hits.append(TrackerHit(tracker, "inline", snippet, snippet))
+        return hits
+
+
+def summarize_trackers(hits: list) -> list:
+    """
+    Distinct trackers from classify() hits, in first-seen order.
+    """
+    trackers = {}
+    for hit in hits:
+        trackers.setdefault(hit.tracker.id, hit.tracker)
+    return list(trackers.values())
+
+
+def load_tracker_db(path: str = TRACKER_DB_PATH) -> TrackerDB:
+    """
+    Index a JSON signature database: {"name": ..., "trackers": [{"id", "name",
+    "owner", "category", "hosts": [...], "paths": ["host/path", ...], "snippets": [...]}]}.
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    return TrackerDB(spec["trackers"], name=spec.get("name", os.path.basename(path)))
+
+
+_default_db = None
+_default_lock = threading.Lock()
+
+
+def get_tracker_db() -> TrackerDB:
+    """
+    The default database, indexed on first use and shared by every caller.
+    """
+    global _default_db
+    with _default_lock:
+        if _default_db is None:
+            _default_db = load_tracker_db()
+        return _default_db
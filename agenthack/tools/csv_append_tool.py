@@ -14,7 +14,7 @@ def append_row(csv_path: str, row: list) -> str:
         writer = csv.writer(f)
         if not file_exists:
             # Write headers
-            writer.writerow(["page", "url", "forms", "inputs", "cookies", "trackers", "ai_summary"])
+            writer.writerow(["page", "url", "forms", "inputs", "cookies", "trackers", "ai_summary", "portia_summary"])
 
         writer.writerow(row)
 
@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+# Priority classes: lower runs first
+INTERACTIVE = 0
+BATCH = 10
+
+# Keep in step with the Ollama server's OLLAMA_NUM_PARALLEL
+LLM_PARALLELISM = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+
+
+class LLMScheduler:
+    """
+    Process-wide queue in front of the local model.
+    Runs at most `workers` requests at once, always picks the highest priority
+    class first, round-robins between sessions inside a class, and coalesces
+    requests whose key is already queued or running into a single generation.
+    """
+
+    def __init__(self, workers: int = LLM_PARALLELISM):
+        self._cond = threading.Condition()
+        self._queues = {}      # priority -> OrderedDict(session -> deque of jobs)
+        self._inflight = {}    # key -> Future
+        self.coalesced = 0
+        self.completed = 0
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._worker, name=f"llm-worker-{i}", daemon=True).start()
+
+    def submit(self, fn, key: str = None, priority: int = BATCH, session: str = "default") -> Future:
+        """
+        Queue fn() and return a Future for its result.
+        If a job with the same key is already pending, its Future is returned instead.
+        """
+        with self._cond:
+            if key is not None and key in self._inflight:
+                self.coalesced += 1
+                return self._inflight[key]
+            future = Future()
+            if key is not None:
+                self._inflight[key] = future
+            sessions = self._queues.setdefault(priority, OrderedDict())
+            sessions.setdefault(session, deque()).append((future, fn, key))
+            self._cond.notify()
+        return future
+
+    def _next_job(self):
+        for priority in sorted(self._queues):
+            sessions = self._queues[priority]
+            if not sessions:
+                continue
+            session, jobs = next(iter(sessions.items()))
+            job = jobs.popleft()
+            # Rotate the session to the back so others get the next slot
+            del sessions[session]
+            if jobs:
+                sessions[session] = jobs
+            return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+            future, fn, key = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn())
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                if key is not None:
+                    self._inflight.pop(key, None)
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = sum(len(jobs) for sessions in self._queues.values() for jobs in sessions.values())
+            return {"queued": queued, "completed": self.completed, "coalesced": self.coalesced}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    The scheduler shared by the CLI threads and every Streamlit session.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
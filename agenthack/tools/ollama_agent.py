@@ -1,8 +1,28 @@
+import os
+import threading
 import ollama
 
-def ask_ollama(prompt: str, model: str = "qwen2.5:1.5b") -> str:
+from tools.llm_cache import cache_key, get_llm_cache
+from tools.llm_scheduler import BATCH, get_scheduler
+
+# Set POLICYSHERLOCK_NO_LLM_CACHE=1 to always hit the model
+USE_LLM_CACHE = os.environ.get("POLICYSHERLOCK_NO_LLM_CACHE", "") not in ("1", "true", "yes")
+OLLAMA_ERROR_PREFIX = "❌ Ollama error:"  # returned (or streamed last) in place of an answer when the call fails
+
+def is_ollama_error(text: str) -> bool:
+    """
+    True if an ask_ollama/ask_ollama_stream result is (or ends in) an error
+    message rather than a model answer; such results must not be stored.
+    """
+    return OLLAMA_ERROR_PREFIX in text
+
+def ask_ollama(prompt: str, model: str = "qwen2.5:1.5b", options: dict = None, use_cache: bool = True,
+               priority: int = BATCH, session: str = "default") -> str:
     """
     Sends a prompt to the Ollama model and returns the response.
+    Identical (model, messages, options) requests are answered from the local cache
+    unless use_cache=False. Model calls go through the shared scheduler, which
+    orders them by priority/session and runs identical in-flight prompts once.
     """
     try:
         # Define the message structure
@@ -10,9 +30,126 @@ def ask_ollama(prompt: str, model: str = "qwen2.5:1.5b") -> str:
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": prompt}
         ]
-        
-        # Call the chat method
-        response = ollama.chat(model=model, messages=messages)
-        return response["message"]["content"]
+
+        cache = get_llm_cache() if (use_cache and USE_LLM_CACHE) else None
+        key = cache_key(model, messages, options)
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        def generate():
+            # Call the chat method
+            response = ollama.chat(model=model, messages=messages, options=options)
+            content = response["message"]["content"]
+            if cache:
+                cache.put(key, model, content)
+            return content
+
+        return get_scheduler().submit(generate, key=key, priority=priority, session=session).result()
     except Exception as e:
-        return f"❌ Ollama error: {e}"
+        return f"{OLLAMA_ERROR_PREFIX} {e}"
+
+class _TokenStream:
+    """
+    One streamed generation, shared by every reader of the same prompt.
+    Tokens are kept, so a reader that joins late replays them from the start.
+    """
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.readers = 0
+        self.cond = threading.Condition()
+
+_streams = {}  # cache key -> _TokenStream still generating
+_streams_lock = threading.Lock()
+
+def _generate_stream(stream: _TokenStream, key: str, model: str, messages: list, options: dict, cache):
+    # Runs on a scheduler worker and hands tokens over to the readers
+    response, parts, finished = None, [], False
+    try:
+        with _streams_lock:
+            abandoned = not stream.readers
+        if not abandoned:
+            response = ollama.chat(model=model, messages=messages, options=options, stream=True)
+            for chunk in response:
+                with _streams_lock:
+                    if not stream.readers:
+                        break  # every reader stopped (e.g. a Streamlit rerun): free the model slot
+                token = chunk["message"]["content"]
+                if token:
+                    parts.append(token)
+                    with stream.cond:
+                        stream.tokens.append(token)
+                        stream.cond.notify_all()
+            else:
+                finished = True
+        if finished and cache:
+            cache.put(key, model, "".join(parts))
+    except Exception as e:
+        with stream.cond:
+            stream.tokens.append(f"{OLLAMA_ERROR_PREFIX} {e}")
+    finally:
+        if response is not None and hasattr(response, "close"):
+            response.close()  # drops the HTTP stream, so Ollama stops generating
+        with _streams_lock:
+            if _streams.get(key) is stream:
+                del _streams[key]
+        with stream.cond:
+            stream.done = True
+            stream.cond.notify_all()
+
+def ask_ollama_stream(prompt: str, model: str = "qwen2.5:1.5b", options: dict = None, use_cache: bool = True,
+                      priority: int = BATCH, session: str = "default"):
+    """
+    Streaming variant of ask_ollama: yields the response text piece by piece.
+    A cache hit yields the stored response in one piece; a completed stream is cached.
+    Identical prompts streaming at the same time (same cache key) read one
+    generation. When every reader has stopped (the generator was closed or
+    dropped), the generation is cancelled; a partial answer is never cached.
+    """
+    try:
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+        cache = get_llm_cache() if (use_cache and USE_LLM_CACHE) else None
+        key = cache_key(model, messages, options)
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        with _streams_lock:
+            stream = _streams.get(key)
+            if stream is None:
+                stream = _streams[key] = _TokenStream()
+                get_scheduler().submit(lambda: _generate_stream(stream, key, model, messages, options, cache),
+                                       priority=priority, session=session)
+            stream.readers += 1
+    except Exception as e:
+        yield f"{OLLAMA_ERROR_PREFIX} {e}"
+        return
+
+    try:
+        read = 0
+        while True:
+            with stream.cond:
+                while read >= len(stream.tokens) and not stream.done:
+                    stream.cond.wait()
+                new, done = stream.tokens[read:], stream.done
+            read += len(new)
+            yield from new
+            if done and not new:
+                return
+    finally:
+        with _streams_lock:
+            stream.readers -= 1
+
+def llm_cache_stats() -> dict:
+    """
+    Hit/miss counters and size of the response cache for this process.
+    """
+    return get_llm_cache().stats()
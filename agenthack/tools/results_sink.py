@@ -0,0 +1,232 @@
+import os
+import csv
+import json
+import queue
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV and JSON Lines still work without it
+    pa = pq = None
+
+AUDIT_COLUMNS = ["page", "url", "forms", "inputs", "cookies", "trackers", "ai_summary", "portia_summary"]
+INT_COLUMNS = ("forms", "inputs", "trackers")  # Parquet int64; every other column is a string
+SINK_FORMATS = ("csv", "jsonl", "parquet")
+SINK_FLUSH_ROWS = 500     # write a batch once this many rows are queued...
+SINK_FLUSH_SECS = 1.0     # ...or once the oldest queued row is this old
+SINK_QUEUE_SIZE = 10000   # producers block past this, rather than buffering without bound
+
+_CLOSE = object()
+
+
+def parquet_schema(columns: list):
+    """
+    Fixed Parquet schema, so a first batch of nulls or mixed types cannot
+    pin a column to the wrong type.
+    """
+    return pa.schema([(c, pa.int64() if c in INT_COLUMNS else pa.string()) for c in columns])
+
+
+def _coerce(value, is_int: bool):
+    if value is None:
+        return None
+    if is_int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+
+
+def parquet_table(batch: list, schema):
+    """
+    A batch of row dicts as a pyarrow Table of the given schema, each value
+    converted to its column's type (unparseable integers become null).
+    """
+    return pa.Table.from_pydict(
+        {f.name: [_coerce(row.get(f.name), pa.types.is_integer(f.type)) for row in batch] for f in schema},
+        schema=schema,
+    )
+
+
+class ResultsSink:
+    """
+    Buffered, single-writer output for audit rows.
+    Any number of threads call write(); one writer thread owns the files and
+    appends rows in batches to <base>.csv and <base>.jsonl, fsyncing both after
+    every batch, so a crash loses at most the batch in flight. Parquet row
+    groups go to <base>.parquet.tmp, which is renamed into place on close()
+    (a Parquet file is unreadable until its footer is written). A Parquet
+    failure only disables Parquet; the CSV/JSON Lines journal keeps going.
+    """
+
+    def __init__(self, base_path: str, columns: list = AUDIT_COLUMNS, formats=SINK_FORMATS,
+                 flush_rows: int = SINK_FLUSH_ROWS, flush_secs: float = SINK_FLUSH_SECS):
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+        self.base_path = base_path
+        self.columns = list(columns)
+        self.formats = [f for f in formats if f != "parquet" or pq is not None]
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.rows_written = 0
+        self.batches = 0
+        self.error = None
+        self.parquet_error = None
+        self._queue = queue.Queue(maxsize=SINK_QUEUE_SIZE)
+        self._files = {}
+        self._parquet = None
+        self._schema = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="results-sink", daemon=True)
+        self._thread.start()
+
+    def path(self, fmt: str) -> str:
+        return f"{self.base_path}.{fmt}"
+
+    def write(self, row) -> None:
+        """
+        Queue one row: a dict keyed by column, or a list in column order.
+        """
+        if self._closed:
+            raise ValueError("ResultsSink is closed")
+        if not isinstance(row, dict):
+            row = dict(zip(self.columns, row))
+        self._queue.put(row)
+
+    def close(self) -> str:
+        """
+        Flush everything queued, finish the Parquet file and stop the writer.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        if self.error is not None:
+            return f"❌ Results sink failed after {self.rows_written} rows: {self.error}"
+        paths = ", ".join(self.path(f) for f in self.formats if f != "parquet" or self.parquet_error is None)
+        message = f"✅ {self.rows_written} rows written to: {paths}"
+        if self.parquet_error is not None:
+            message += f" (Parquet disabled: {self.parquet_error})"
+        return message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- writer thread ----
+    def _run(self):
+        batch, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _CLOSE:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_secs
+            if batch and (item is None or item is _CLOSE or len(batch) >= self.flush_rows):
+                self._flush(batch)
+                batch, deadline = [], None
+            if item is _CLOSE:
+                self._finish()
+                return
+
+    def _open(self, fmt):
+        f = self._files.get(fmt)
+        if f is None:
+            path = self.path(fmt)
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            f = open(path, "a", newline="" if fmt == "csv" else None, encoding="utf-8")
+            if fmt == "csv" and is_new:
+                csv.writer(f).writerow(self.columns)
+            self._files[fmt] = f
+        return f
+
+    def _flush(self, batch):
+        if self.error is None:
+            try:
+                if "csv" in self.formats:
+                    csv.writer(self._open("csv")).writerows([row.get(c, "") for c in self.columns] for row in batch)
+                if "jsonl" in self.formats:
+                    self._open("jsonl").writelines(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in batch)
+                for f in self._files.values():
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.rows_written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                # Stop writing but keep draining the queue, so producers never block on a dead sink
+                self.error = e
+        if "parquet" in self.formats and self.parquet_error is None:
+            try:
+                self._write_parquet(batch)
+            except Exception as e:
+                self.parquet_error = e
+
+    def _write_parquet(self, batch):
+        if self._parquet is None:
+            self._schema = parquet_schema(self.columns)
+            self._parquet = pq.ParquetWriter(self.path("parquet") + ".tmp", self._schema)
+        self._parquet.write_table(parquet_table(batch, self._schema))
+
+    def _finish(self):
+        for f in self._files.values():
+            f.close()
+        if self._parquet is not None:
+            try:
+                self._parquet.close()
+            except Exception as e:
+                self.parquet_error = self.parquet_error or e
+            if self.error is None and self.parquet_error is None:
+                os.replace(self.path("parquet") + ".tmp", self.path("parquet"))
+
+
+def export_jsonl(jsonl_path: str, base_path: str, columns: list = AUDIT_COLUMNS,
+                 formats=("csv", "parquet"), batch_rows: int = SINK_FLUSH_ROWS) -> str:
+    """
+    Rebuild <base>.csv / <base>.parquet from a JSON Lines file in one streaming
+    pass. Each output is written to a temporary file and renamed into place.
+    """
+    formats = [f for f in formats if f != "parquet" or pq is not None]
+    tmp = {fmt: f"{base_path}.{fmt}.tmp" for fmt in formats}
+    csv_file = open(tmp["csv"], "w", newline="", encoding="utf-8") if "csv" in formats else None
+    schema = parquet_schema(columns) if "parquet" in formats else None
+    parquet = pq.ParquetWriter(tmp["parquet"], schema) if schema is not None else None
+    rows = 0
+
+    def write_batch(batch):
+        if csv_file:
+            csv.writer(csv_file).writerows([row.get(c, "") for c in columns] for row in batch)
+        if parquet is not None:
+            parquet.write_table(parquet_table(batch, schema))
+
+    try:
+        if csv_file:
+            csv.writer(csv_file).writerow(columns)
+        batch = []
+        with open(jsonl_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_rows:
+                    write_batch(batch)
+                    rows += len(batch)
+                    batch = []
+        if batch:
+            write_batch(batch)
+            rows += len(batch)
+    finally:
+        if csv_file:
+            csv_file.close()
+        if parquet is not None:
+            parquet.close()
+    for fmt, path in tmp.items():
+        if os.path.exists(path):
+            os.replace(path, f"{base_path}.{fmt}")
+    return f"✅ {rows} rows exported to: " + ", ".join(f"{base_path}.{fmt}" for fmt in formats)